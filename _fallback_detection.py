@@ -1,3 +1,5 @@
+from element_record import ElementRecord
+
 def _fallback_element_detection(self, soup):
     """
     More aggressive element detection for pages where standard detection finds few elements.
@@ -11,15 +13,16 @@ def _fallback_element_detection(self, soup):
         if onclick_elements:
             fallback_elements['clickable'] = []
             for element in onclick_elements[:10]:  # Limit to 10 elements
-                element_info = {
-                    'tag': element.name,
-                    'id': element.get('id', ''),
-                    'class': ' '.join(element.get('class', [])) if element.get('class') else '',
-                    'text': element.get_text().strip(),
-                    'action': 'click',
-                    'selector': None
-                }
-                element_info['selector'] = self._create_selector_for_element(element_info)
+                element_info = ElementRecord(
+                    tag=element.name,
+                    id=element.get('id', ''),
+                    text=element.get_text().strip(),
+                    action='click',
+                    selector=None,
+                    node=element
+                )
+                element_info['class'] = ' '.join(element.get('class', [])) if element.get('class') else ''
+                element_info['selector'] = self._create_unique_selector(element_info, soup)
                 if element_info['selector']:
                     fallback_elements['clickable'].append(element_info)
         
@@ -32,15 +35,16 @@ def _fallback_element_detection(self, soup):
                 # Skip if already added via onclick
                 if any(e.get('id') == element.get('id') for e in fallback_elements.get('clickable', []) if e.get('id')):
                     continue
-                element_info = {
-                    'tag': element.name,
-                    'id': element.get('id', ''),
-                    'class': ' '.join(element.get('class', [])) if element.get('class') else '',
-                    'text': element.get_text().strip(),
-                    'action': 'click',
-                    'selector': None
-                }
-                element_info['selector'] = self._create_selector_for_element(element_info)
+                element_info = ElementRecord(
+                    tag=element.name,
+                    id=element.get('id', ''),
+                    text=element.get_text().strip(),
+                    action='click',
+                    selector=None,
+                    node=element
+                )
+                element_info['class'] = ' '.join(element.get('class', [])) if element.get('class') else ''
+                element_info['selector'] = self._create_unique_selector(element_info, soup)
                 if element_info['selector']:
                     fallback_elements['clickable'].append(element_info)
         
@@ -50,15 +54,16 @@ def _fallback_element_detection(self, soup):
             if 'focusable' not in fallback_elements:
                 fallback_elements['focusable'] = []
             for element in tabindex_elements[:5]:  # Limit to 5 elements
-                element_info = {
-                    'tag': element.name,
-                    'id': element.get('id', ''),
-                    'class': ' '.join(element.get('class', [])) if element.get('class') else '',
-                    'text': element.get_text().strip(),
-                    'action': 'click',
-                    'selector': None
-                }
-                element_info['selector'] = self._create_selector_for_element(element_info)
+                element_info = ElementRecord(
+                    tag=element.name,
+                    id=element.get('id', ''),
+                    text=element.get_text().strip(),
+                    action='click',
+                    selector=None,
+                    node=element
+                )
+                element_info['class'] = ' '.join(element.get('class', [])) if element.get('class') else ''
+                element_info['selector'] = self._create_unique_selector(element_info, soup)
                 if element_info['selector']:
                     fallback_elements['focusable'].append(element_info)
         
@@ -67,15 +72,16 @@ def _fallback_element_detection(self, soup):
         if hover_elements and not fallback_elements:
             fallback_elements['hover'] = []
             for element in hover_elements[:5]:  # Limit to 5 elements
-                element_info = {
-                    'tag': element.name,
-                    'id': element.get('id', ''),
-                    'class': ' '.join(element.get('class', [])) if element.get('class') else '',
-                    'text': element.get_text().strip(),
-                    'action': 'click',
-                    'selector': None
-                }
-                element_info['selector'] = self._create_selector_for_element(element_info)
+                element_info = ElementRecord(
+                    tag=element.name,
+                    id=element.get('id', ''),
+                    text=element.get_text().strip(),
+                    action='click',
+                    selector=None,
+                    node=element
+                )
+                element_info['class'] = ' '.join(element.get('class', [])) if element.get('class') else ''
+                element_info['selector'] = self._create_unique_selector(element_info, soup)
                 if element_info['selector']:
                     fallback_elements['hover'].append(element_info)
                     
@@ -5,6 +5,7 @@ from flask import Flask, render_template, request, redirect, url_for, jsonify, s
 from crawler import crawl_website_and_screenshot
 from template_generator import generate_tests_with_templates
 from test_executor import execute_tests
+from test_rerun import save_last_run
 from reporter import generate_report
 
 # Configure Flask to ignore changes in the generated_tests directory
@@ -141,9 +142,10 @@ def run_test_process(url, visual_mode, single_page_mode, requires_auth=False, au
         
         if visual_mode:
             add_process_detail(f"Visual mode enabled - browser will be visible during test execution")
-            add_process_detail(f"Note: Visual mode tests will create *_visual.py files that can be run manually")
+            add_process_detail(f"Note: Visual mode runs each test plan with a visible browser and a pause between steps")
         
         results = execute_tests(test_scripts, visual_mode=visual_mode)
+        save_last_run(results)
         current_test["results"] = results
         
         # Extract some summary information from results
@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import asyncio
+import traceback
+from urllib.parse import urlsplit
+from playwright.async_api import async_playwright
+from element_tracker import ElementTracker
+from session_manager import session_manager
+from test_runner import BROWSER_ARGS, load_test_plan, print_summary
+from plan_steps import VIEWPORT, REGION_MARGIN, debug_screenshots, run_async, run_plan_steps
+
+# Pages driven at once, and at most this many of them on the same origin
+DEFAULT_CONCURRENCY = 4
+DEFAULT_PER_ORIGIN = 2
+
+async def run_test_plan(plan, browser, output_dir="test_results", screenshots_dir="generated_tests/screenshots",
+                        batch_forms=True, test_id=None, element_tracker=None, save_results=True, debug=None,
+                        region_margin=REGION_MARGIN):
+    """
+    Execute a test plan in a fresh context of a running browser.
+
+    Same arguments and records as test_runner.run_test_plan, without visual mode.
+
+    Returns:
+        ElementTracker: The tracker holding the recorded element results
+    """
+    url = plan['url']
+    if debug is None:
+        debug = debug_screenshots()
+    if element_tracker is None:
+        element_tracker = ElementTracker(output_dir=output_dir, test_id=test_id)
+    # The tracker may have been made long before the plan got a page
+    element_tracker.started_at = time.monotonic()
+    context = None
+    try:
+        print(f"Starting test for {url}")
+        context = await browser.new_context(viewport=VIEWPORT)
+        session_loaded = await session_manager.load_session_async(context, url)
+        page = await context.new_page()
+        page.set_default_timeout(30000)
+
+        await run_async(run_plan_steps(
+            page, plan, element_tracker, output_dir, screenshots_dir,
+            apply_storage=session_manager.apply_storage_async if session_loaded else None,
+            batch_forms=batch_forms, debug=debug, region_margin=region_margin
+        ))
+
+        print(f"Test completed for {url}")
+    except Exception as e:
+        print(f"Test failed for {url}: {e}")
+        traceback.print_exc()
+        raise
+    finally:
+        if context:
+            try:
+                await context.close()
+            except Exception as close_error:
+                print(f"Error closing browser context: {close_error}")
+        if save_results:
+            results_path = element_tracker.save_results()
+            print(f"Element tracking results saved to: {results_path}")
+        print_summary(element_tracker)
+
+    return element_tracker
+
+async def _run_with_deadline(coroutine, element_tracker, timeout, heartbeat_timeout):
+    """
+    Await a plan's run, cancelling it when it runs past timeout seconds or goes
+    heartbeat_timeout seconds without a record. A cancelled run still closes its
+    context and saves its partial records, marked timed_out in the stats.
+    """
+    task = asyncio.ensure_future(coroutine)
+    started = last_beat = time.monotonic()
+    recorded = len(element_tracker.elements)
+    while True:
+        now = time.monotonic()
+        if len(element_tracker.elements) != recorded:
+            recorded, last_beat = len(element_tracker.elements), now
+        deadlines = [started + timeout] if timeout else []
+        if heartbeat_timeout:
+            deadlines.append(last_beat + heartbeat_timeout)
+        wait = min(deadlines) - now
+        if wait <= 0:
+            break
+        done, _ = await asyncio.wait({task}, timeout=min(wait, 1))
+        if done:
+            return task.result()
+
+    if timeout and now >= started + timeout:
+        reason = f"Test timed out after {timeout:g}s"
+    else:
+        reason = f"Test hung: no progress for {heartbeat_timeout:g}s"
+    print(f"{reason}: {element_tracker.test_id}")
+    # Set before cancelling, so the results saved on the way out carry it
+    element_tracker.stats['timed_out'] = True
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+    raise TimeoutError(f"{reason} ({len(element_tracker.elements)} elements recorded before it stopped)")
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+async def run_test_plans(plans, output_dir="test_results", screenshots_dirs=None, test_ids=None,
+                         concurrency=DEFAULT_CONCURRENCY, per_origin=DEFAULT_PER_ORIGIN, batch_forms=True,
+                         element_trackers=None, save_results=True, timeout=None, heartbeat_timeout=None):
+    """
+    Run test plans concurrently on pages of one browser.
+
+    Args:
+        plans: Test plan dicts
+        output_dir: Directory where element results are saved
+        screenshots_dirs: Screenshots directory of each plan (defaults to generated_tests/screenshots/<n>)
+        test_ids: Results file name of each plan (see ElementTracker)
+        concurrency: Maximum number of pages driven at once
+        per_origin: Maximum number of pages of the same origin driven at once
+        element_trackers: Tracker of each plan to record into (created when None)
+        save_results: Also write each plan's records to its JSON results file
+        timeout: Wall-clock budget of one plan in seconds, counted from when it gets a page;
+            a plan that overruns it is cancelled and keeps the records it had made
+        heartbeat_timeout: Seconds a plan may go without recording an element before it
+            is cancelled the same way
+
+    Returns:
+        list: ElementTracker of each plan, or the exception that stopped it, in plan order
+    """
+    screenshots_dirs = screenshots_dirs or [os.path.join("generated_tests", "screenshots", str(i))
+                                            for i in range(len(plans))]
+    test_ids = test_ids or [None] * len(plans)
+    element_trackers = element_trackers or [None] * len(plans)
+    semaphore = asyncio.Semaphore(concurrency)
+    origin_semaphores = {}
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=BROWSER_ARGS)
+
+        async def run_one(plan, screenshots_dir, test_id, element_tracker):
+            origin_semaphore = origin_semaphores.setdefault(_origin(plan['url']), asyncio.Semaphore(per_origin))
+            # Take the origin slot first, so a page waiting on its origin does not hold a global slot
+            async with origin_semaphore, semaphore:
+                if not timeout and not heartbeat_timeout:
+                    return await run_test_plan(plan, browser, output_dir, screenshots_dir, batch_forms, test_id,
+                                               element_tracker, save_results)
+                element_tracker = element_tracker or ElementTracker(output_dir=output_dir, test_id=test_id)
+                return await _run_with_deadline(
+                    run_test_plan(plan, browser, output_dir, screenshots_dir, batch_forms, test_id,
+                                  element_tracker, save_results),
+                    element_tracker, timeout, heartbeat_timeout)
+
+        try:
+            return await asyncio.gather(*(run_one(*args) for args in zip(plans, screenshots_dirs, test_ids,
+                                                                          element_trackers)),
+                                        return_exceptions=True)
+        finally:
+            await browser.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python async_runner.py <test_plan.json>... [--concurrency=K] [--per-origin=N]")
+        sys.exit(1)
+    plan_paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+    asyncio.run(run_test_plans(
+        [load_test_plan(path) for path in plan_paths],
+        screenshots_dirs=[os.path.join(os.path.dirname(os.path.abspath(path)), "screenshots",
+                                       os.path.splitext(os.path.basename(path))[0]) for path in plan_paths],
+        test_ids=[os.path.splitext(os.path.basename(path))[0] for path in plan_paths],
+        concurrency=int(options.get("concurrency", DEFAULT_CONCURRENCY)),
+        per_origin=int(options.get("per-origin", DEFAULT_PER_ORIGIN))
+    ))
@@ -5,6 +5,7 @@ import logging
 from urllib.parse import urljoin, urlparse
 from playwright.sync_api import sync_playwright
 from session_manager import session_manager
+from element_inventory import capture_element_inventory, save_element_inventory
 
 logging.basicConfig(level=logging.INFO)
 
@@ -311,7 +312,17 @@ def perform_login(page, auth_params):
         logging.error(f"Error during login: {e}")
         return False
 
-def crawl_website_and_screenshot(base_url, out_dir="screenshots", max_depth=3, throttle_seconds=1, single_page_mode=False, requires_auth=False, auth_params=None):
+def save_page_inventory(page, url, filename, backend="dom"):
+    """Capture the rendered page's element inventory and save it next to its HTML"""
+    records = capture_element_inventory(page, backend)
+    if records is None:
+        return None, None
+    inventory_path = os.path.join('html_files', filename + "_inventory.json")
+    save_element_inventory(records, url, inventory_path)
+    logging.info(f"Saved element inventory with {len(records)} candidates: {inventory_path}")
+    return records, inventory_path
+
+def crawl_website_and_screenshot(base_url, out_dir="screenshots", max_depth=3, throttle_seconds=1, single_page_mode=False, requires_auth=False, auth_params=None, inventory_backend="dom"):
     os.makedirs(out_dir, exist_ok=True)
     os.makedirs('html_files', exist_ok=True)
     visited = set()
@@ -358,12 +369,17 @@ def crawl_website_and_screenshot(base_url, out_dir="screenshots", max_depth=3, t
             with open(login_html_path, "w", encoding="utf-8") as f:
                 f.write(login_html)
             
+            # Save login page element inventory
+            login_inventory, login_inventory_path = save_page_inventory(login_page, login_page_url, login_filename + "_before_auth", inventory_backend)
+            
             # Store login page info
             pages.append({
                 'url': login_page_url,
                 'html': login_html,
                 'screenshot': login_screenshot_path,
-                'html_file': login_html_path
+                'html_file': login_html_path,
+                'inventory': login_inventory,
+                'inventory_file': login_inventory_path
             })
             
             # Extract internal links from login page if not in single page mode
@@ -443,12 +459,17 @@ def crawl_website_and_screenshot(base_url, out_dir="screenshots", max_depth=3, t
                 with open(auth_html_path, "w", encoding="utf-8") as f:
                     f.write(auth_html)
                 
+                # Save element inventory of authenticated page
+                auth_inventory, auth_inventory_path = save_page_inventory(auth_page, auth_url, auth_filename + "_after_auth", inventory_backend)
+                
                 # Store authenticated page info
                 pages.append({
                     'url': auth_url,
                     'html': auth_html,
                     'screenshot': auth_screenshot_path,
-                    'html_file': auth_html_path
+                    'html_file': auth_html_path,
+                    'inventory': auth_inventory,
+                    'inventory_file': auth_inventory_path
                 })
                 
                 # Extract internal links from authenticated page if not in single page mode
@@ -556,12 +577,17 @@ def crawl_website_and_screenshot(base_url, out_dir="screenshots", max_depth=3, t
                     with open(html_path, "w", encoding="utf-8") as f:
                         f.write(html)
 
+                    # Save element inventory from the rendered page
+                    inventory, inventory_path = save_page_inventory(page, url, filename, inventory_backend)
+
                     # Store page info
                     pages.append({
                         'url': url,
                         'html': html,
                         'screenshot': screenshot_path,
-                        'html_file': html_path
+                        'html_file': html_path,
+                        'inventory': inventory,
+                        'inventory_file': inventory_path
                     })
 
                     # Extract internal links (only if not in single page mode)
@@ -0,0 +1,349 @@
+import os
+import json
+import logging
+
+# Version of the inventory record format, bump when the extraction script changes
+INVENTORY_FORMAT_VERSION = 3
+
+# Backends choosing the inventory's candidates: "dom" walks the DOM with CSS and
+# cursor heuristics, "accessibility" takes the nodes of the browser's accessibility tree
+# that have an interactive role or are focusable
+INVENTORY_BACKENDS = ("dom", "accessibility")
+
+# Accessibility tree roles treated as interactive by the accessibility backend
+AX_INTERACTIVE_ROLES = {
+    'button', 'link', 'textbox', 'searchbox', 'checkbox', 'radio', 'combobox', 'listbox',
+    'menuitem', 'menuitemcheckbox', 'menuitemradio', 'tab', 'slider', 'spinbutton', 'switch',
+    'treeitem', 'option', 'dialog', 'alertdialog', 'form'
+}
+
+# Attribute marking the accessibility tree's candidates for the inventory script
+AX_MARKER_ATTRIBUTE = 'data-inventory-ax'
+
+# Event types whose listeners make an element a candidate
+LISTENER_EVENT_TYPES = {
+    'click', 'dblclick', 'mousedown', 'mouseup', 'pointerdown', 'pointerup', 'touchstart',
+    'keydown', 'keyup', 'keypress', 'change', 'input', 'submit'
+}
+
+# Attribute marking elements with event listeners, holding the listened event types
+LISTENER_MARKER_ATTRIBUTE = 'data-inventory-listener'
+
+# In-page extraction of interactive candidates. Runs once per crawled page and returns
+# one record per candidate, in document order, with a selector verified to be unique.
+# With the accessibility backend it is passed the marked nodes' roles and names; when the
+# event listeners were marked, listening elements replace the cursor:pointer heuristic.
+ELEMENT_INVENTORY_SCRIPT = r"""
+({axNodes, listeners}) => {
+    const CANDIDATE_SELECTOR = [
+        'a', 'button', 'input:not([type="hidden"])', 'select', 'textarea', 'summary', 'form',
+        '[role]', '[onclick]', '[onmousedown]', '[onmouseup]', '[data-action]',
+        '[tabindex]:not([tabindex="-1"])', '[contenteditable="true"]', '[aria-haspopup]', '[aria-expanded]'
+    ].join(', ');
+    const ATTRIBUTES = ['id', 'class', 'name', 'type', 'value', 'placeholder', 'href', 'aria-label',
+                        'data-testid', 'data-cy', 'data-qa', 'role', 'title', 'alt'];
+    const SELECTOR_ATTRIBUTES = ['data-testid', 'data-cy', 'data-qa', 'name', 'aria-label',
+                                 'placeholder', 'title', 'alt', 'href'];
+
+    const quote = value => '"' + value.replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, ' ') + '"';
+    const countMatches = selector => {
+        try {
+            return document.querySelectorAll(selector).length;
+        } catch (e) {
+            return 0;
+        }
+    };
+    const typeIndex = node => {
+        let index = 1;
+        let sibling = node;
+        while ((sibling = sibling.previousElementSibling)) {
+            if (sibling.tagName === node.tagName) index++;
+        }
+        return index;
+    };
+
+    const uniqueSelector = el => {
+        const tag = el.tagName.toLowerCase();
+        if (el.id && countMatches('#' + CSS.escape(el.id)) === 1) return '#' + CSS.escape(el.id);
+        for (const attr of SELECTOR_ATTRIBUTES) {
+            const value = el.getAttribute(attr);
+            if (!value) continue;
+            const selector = `${tag}[${attr}=${quote(value)}]`;
+            if (countMatches(selector) === 1) return selector;
+        }
+        // nth-of-type path up to the closest ancestor with a unique id
+        const parts = [];
+        for (let node = el; node && node.nodeType === Node.ELEMENT_NODE; node = node.parentElement) {
+            if (node !== el && node.id && countMatches('#' + CSS.escape(node.id)) === 1) {
+                parts.unshift('#' + CSS.escape(node.id));
+                break;
+            }
+            parts.unshift(`${node.tagName.toLowerCase()}:nth-of-type(${typeIndex(node)})`);
+        }
+        const selector = parts.join(' > ');
+        return countMatches(selector) === 1 ? selector : null;
+    };
+
+    // Same "tag:index" path format as RoleBasedTestGenerator.find_component_candidates
+    const domPath = el => {
+        const parts = [];
+        for (let node = el; node && node.nodeType === Node.ELEMENT_NODE; node = node.parentElement) {
+            parts.unshift(`${node.tagName.toLowerCase()}:${typeIndex(node)}`);
+        }
+        return parts.join('/');
+    };
+
+    const isPointer = el => getComputedStyle(el).cursor === 'pointer';
+
+    // Frameworks delegate events to one listener on a root and keep each element's
+    // handlers in properties (React props, Vue 3 invokers); resolve those to their targets
+    const FRAMEWORK_HANDLERS = {
+        onClick: 'click', onDoubleClick: 'dblclick', onMouseDown: 'mousedown', onMouseUp: 'mouseup',
+        onPointerDown: 'pointerdown', onPointerUp: 'pointerup', onTouchStart: 'touchstart',
+        onKeyDown: 'keydown', onKeyUp: 'keyup', onKeyPress: 'keypress',
+        onChange: 'change', onInput: 'input', onSubmit: 'submit'
+    };
+    const delegatedTypes = el => {
+        const types = new Set();
+        for (const key of Object.keys(el)) {
+            if (!(key.startsWith('__reactProps$') || key.startsWith('__reactEventHandlers$') || key === '_vei')) continue;
+            const handlers = el[key] || {};
+            for (const name of Object.keys(handlers)) {
+                if (FRAMEWORK_HANDLERS[name] && handlers[name]) types.add(FRAMEWORK_HANDLERS[name]);
+            }
+        }
+        return Array.from(types);
+    };
+    // Containers whose listeners only dispatch to the framework's handlers
+    const isDelegationRoot = el => Object.keys(el).some(key =>
+        key.startsWith('__reactContainer$') || key === '_reactRootContainer' || key === '__vue_app__');
+
+    // Why an element cannot be interacted with, from its computed style and layout
+    const hiddenReason = (el, style, rect) => {
+        if (el.checkVisibility ? !el.checkVisibility() : style.display === 'none' || !el.getClientRects().length) {
+            return 'display_none';
+        }
+        if (style.visibility === 'hidden' || style.visibility === 'collapse') return 'visibility_hidden';
+        if (rect.width === 0 || rect.height === 0) return 'zero_area';
+        if (el.closest('[inert]')) return 'inert';
+        return null;
+    };
+
+    // Whether another element receives the pointer at the element's centre.
+    // Only decidable inside the viewport; hits on the element's labels count as its own.
+    const isObscured = (el, rect) => {
+        const x = rect.x + rect.width / 2;
+        const y = rect.y + rect.height / 2;
+        if (x < 0 || y < 0 || x >= window.innerWidth || y >= window.innerHeight) return false;
+        const hit = document.elementFromPoint(x, y);
+        if (!hit || el === hit || el.contains(hit)) return false;
+        return !Array.from(el.labels || []).some(label => label === hit || label.contains(hit));
+    };
+
+    const records = [];
+    for (const el of document.querySelectorAll('body *')) {
+        const axMarker = el.getAttribute('data-inventory-ax');
+        const listenerMarker = el.getAttribute('data-inventory-listener');
+        el.removeAttribute('data-inventory-ax');
+        el.removeAttribute('data-inventory-listener');
+        // SVG internals are decorative and removed from the HTML used for generation
+        if (el.closest('svg') && el.tagName.toLowerCase() !== 'svg') continue;
+
+        const ax = axNodes && axMarker !== null ? axNodes[axMarker] : null;
+        let listenerTypes = null;
+        let delegated = false;
+        if (listeners) {
+            listenerTypes = listenerMarker && !isDelegationRoot(el) ? listenerMarker.split(',') : [];
+            if (!listenerTypes.length) {
+                listenerTypes = delegatedTypes(el);
+                delegated = listenerTypes.length > 0;
+            }
+        }
+        const listening = listenerTypes !== null && listenerTypes.length > 0;
+
+        if (axNodes) {
+            if (!ax && !listening) continue;
+        } else if (!el.matches(CANDIDATE_SELECTOR) && !listening) {
+            // Without listener data, elements styled as clickable count too,
+            // unless they only inherit the cursor
+            if (listeners || !isPointer(el) || (el.parentElement && isPointer(el.parentElement))) continue;
+        }
+
+        const attributes = {};
+        for (const attr of ATTRIBUTES) {
+            const value = el.getAttribute(attr);
+            if (value) attributes[attr] = value;
+        }
+        const rect = el.getBoundingClientRect();
+        const style = getComputedStyle(el);
+        const hidden = hiddenReason(el, style, rect);
+        const selector = uniqueSelector(el);
+        const record = {
+            tag: el.tagName.toLowerCase(),
+            attributes: attributes,
+            text: ((ax && ax.name) || el.innerText || el.value || '').trim().slice(0, 200),
+            bbox: {x: rect.x, y: rect.y, width: rect.width, height: rect.height},
+            visible: hidden === null,
+            hidden_reason: hidden,
+            obscured: hidden === null && isObscured(el, rect),
+            selector: selector,
+            match_count: selector ? 1 : 0,
+            dom_path: domPath(el)
+        };
+        if (listeners) {
+            record.listeners = listenerTypes;
+            record.delegated = delegated;
+        }
+        if (ax) {
+            record.ax_role = ax.role;
+            record.ax_name = ax.name;
+            record.focusable = ax.focusable;
+        }
+        records.push(record);
+    }
+    return records;
+}
+"""
+
+def _mark_node(cdp, backend_node_id, attribute, value):
+    """Set an attribute on the element with the given CDP backend node id"""
+    remote_object = cdp.send('DOM.resolveNode', {'backendNodeId': backend_node_id})['object']
+    cdp.send('Runtime.callFunctionOn', {
+        'objectId': remote_object['objectId'],
+        'functionDeclaration': f"function(value) {{ if (this.nodeType === 1) this.setAttribute('{attribute}', value); }}",
+        'arguments': [{'value': value}]
+    })
+
+def _mark_accessibility_candidates(page):
+    """
+    Read the page's full accessibility tree over CDP and mark the DOM nodes of its
+    interactive or focusable entries with AX_MARKER_ATTRIBUTE.
+
+    Returns:
+        dict: marker value -> {'role', 'name', 'focusable'} of the marked nodes
+    """
+    cdp = page.context.new_cdp_session(page)
+    try:
+        cdp.send('DOM.getDocument', {'depth': 0})
+        ax_nodes = {}
+        for node in cdp.send('Accessibility.getFullAXTree')['nodes']:
+            if node.get('ignored') or 'backendDOMNodeId' not in node:
+                continue
+            role = node.get('role', {}).get('value', '')
+            properties = {prop['name']: prop.get('value', {}).get('value') for prop in node.get('properties', [])}
+            focusable = bool(properties.get('focusable'))
+            if role == 'RootWebArea' or (role not in AX_INTERACTIVE_ROLES and not focusable):
+                continue
+
+            marker = str(len(ax_nodes))
+            try:
+                _mark_node(cdp, node['backendDOMNodeId'], AX_MARKER_ATTRIBUTE, marker)
+            except Exception as e:
+                logging.debug(f"Could not resolve accessibility node {node.get('nodeId')}: {e}")
+                continue
+            ax_nodes[marker] = {
+                'role': role,
+                'name': str(node.get('name', {}).get('value', '')),
+                'focusable': focusable
+            }
+        return ax_nodes
+    finally:
+        cdp.detach()
+
+def _mark_listener_targets(page):
+    """
+    Read every event listener in the document over CDP (DOMDebugger.getEventListeners
+    on the whole tree) and mark the elements listening for LISTENER_EVENT_TYPES with
+    LISTENER_MARKER_ATTRIBUTE. Delegated listeners are resolved to their targets by
+    the inventory script.
+
+    Returns:
+        int: Number of marked elements
+    """
+    cdp = page.context.new_cdp_session(page)
+    try:
+        document = cdp.send('DOM.getDocument', {'depth': 0})['root']
+        document_object = cdp.send('DOM.resolveNode', {'nodeId': document['nodeId']})['object']
+        listeners = cdp.send('DOMDebugger.getEventListeners', {
+            'objectId': document_object['objectId'],
+            'depth': -1,
+            'pierce': True
+        })['listeners']
+
+        types_by_node = {}
+        for listener in listeners:
+            if listener['type'] in LISTENER_EVENT_TYPES and 'backendNodeId' in listener:
+                types_by_node.setdefault(listener['backendNodeId'], set()).add(listener['type'])
+
+        marked = 0
+        for backend_node_id, types in types_by_node.items():
+            try:
+                _mark_node(cdp, backend_node_id, LISTENER_MARKER_ATTRIBUTE, ','.join(sorted(types)))
+                marked += 1
+            except Exception as e:
+                logging.debug(f"Could not resolve listener node {backend_node_id}: {e}")
+        return marked
+    finally:
+        cdp.detach()
+
+def capture_element_inventory(page, backend="dom", event_listeners=True):
+    """
+    Run the in-page extraction script on a rendered page.
+
+    Args:
+        page: Playwright page with the rendered page
+        backend: "dom" or "accessibility" (Chromium only, see INVENTORY_BACKENDS)
+        event_listeners: Find candidates from their event listeners (Chromium only);
+                         falls back to the cursor:pointer heuristic when unavailable
+
+    Returns:
+        list: Inventory records (tag, attributes, text, bbox, visible, hidden_reason,
+              obscured, selector, match_count, dom_path, plus listeners and delegated
+              with event listeners, and ax_role, ax_name and focusable with the
+              accessibility backend), or None if the extraction failed
+    """
+    if backend not in INVENTORY_BACKENDS:
+        raise ValueError(f"Unknown inventory backend: {backend}")
+    try:
+        ax_nodes = _mark_accessibility_candidates(page) if backend == "accessibility" else None
+        listeners = False
+        if event_listeners:
+            try:
+                marked = _mark_listener_targets(page)
+                listeners = True
+                logging.info(f"Found {marked} elements with event listeners on {page.url}")
+            except Exception as e:
+                logging.warning(f"Could not read event listeners for {page.url}, using cursor heuristics: {e}")
+        return page.evaluate(ELEMENT_INVENTORY_SCRIPT, {'axNodes': ax_nodes, 'listeners': listeners})
+    except Exception as e:
+        logging.error(f"Error capturing element inventory for {page.url}: {e}")
+        return None
+
+def save_element_inventory(records, url, inventory_path):
+    """Write a page's element inventory to a JSON file"""
+    os.makedirs(os.path.dirname(inventory_path) or '.', exist_ok=True)
+    with open(inventory_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': INVENTORY_FORMAT_VERSION,
+            'url': url,
+            'elements': records
+        }, f, separators=(',', ':'))
+    return inventory_path
+
+def load_element_inventory(inventory_path):
+    """
+    Load a page's element inventory.
+
+    Returns:
+        list: Inventory records, or None if the file is missing or from another format version
+    """
+    try:
+        with open(inventory_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not load element inventory {inventory_path}: {e}")
+        return None
+    if data.get('version') != INVENTORY_FORMAT_VERSION:
+        logging.warning(f"Ignoring element inventory {inventory_path} with format version {data.get('version')}")
+        return None
+    return data.get('elements', [])
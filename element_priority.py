@@ -0,0 +1,216 @@
+import os
+import re
+import glob
+import json
+
+# Base value of testing an element of each role
+ROLE_WEIGHTS = {
+    'form': 5.0,
+    'button': 4.0,
+    'input': 4.0,
+    'select': 3.5,
+    'checkbox': 3.0,
+    'radio': 3.0,
+    'toggle': 3.0,
+    'slider': 3.0,
+    'tab': 3.0,
+    'menu': 3.0,
+    'dialog': 2.5,
+    'alert': 2.0,
+    'link': 2.0,
+    'interactive': 1.5,
+    'clickable': 1.0
+}
+
+# Selector fragments showing the element was given a stable, meaningful name
+SEMANTIC_SELECTOR_MARKERS = ('[data-testid=', '[data-cy=', '[data-qa=', '[aria-label=', '[name=', '[id=')
+
+# Estimated run time of a step in seconds, including its before/after screenshots
+# and, for clicks, the navigation back to the page
+ACTION_COST_SECONDS = {
+    'click': 4.0,
+    'submit': 4.0,
+    'toggle': 2.0,
+    'fill': 1.5,
+    'check': 1.5,
+    'select_option': 1.5,
+    'slide': 1.5,
+    'detect': 1.0
+}
+DEFAULT_ACTION_COST_SECONDS = 2.0
+
+# Page URL assignment of generated test scripts
+TEST_URL_PATTERN = re.compile(r'^TEST_URL = "(.*)"$', re.MULTILINE)
+
+# Estimated time to open a page's context, load it and take its first screenshot
+PAGE_LOAD_COST_SECONDS = 5.0
+
+def _load_result_elements(results_dir):
+    """Yield the element results recorded by previous runs"""
+    for results_file in glob.glob(os.path.join(results_dir, "element_results_*.json")):
+        try:
+            with open(results_file, 'r', encoding='utf-8') as f:
+                elements = json.load(f).get('elements', [])
+        except (OSError, ValueError) as e:
+            print(f"Error reading results file {results_file}: {e}")
+            continue
+        yield from elements
+
+def load_failure_history(results_dir="test_results"):
+    """
+    Collect the elements that failed or did not work in previous runs. Steps skipped
+    because their target was missing, hidden or disabled are not failures.
+
+    Returns:
+        dict: (page_url, selector) -> number of recorded failures
+    """
+    failures = {}
+    for element in _load_result_elements(results_dir):
+        if element.get('skipped'):
+            continue
+        if not element.get('success') or not element.get('is_working'):
+            key = (element.get('page_url'), element.get('selector'))
+            failures[key] = failures.get(key, 0) + 1
+    return failures
+
+def load_navigation_history(results_dir="test_results"):
+    """
+    Collect whether interacting with each element navigated away in previous runs.
+
+    Returns:
+        dict: (page_url, selector) -> True if any successful interaction changed the page
+    """
+    navigations = {}
+    for element in _load_result_elements(results_dir):
+        if element.get('success') and not element.get('skipped'):
+            key = (element.get('page_url'), element.get('selector'))
+            navigations[key] = navigations.get(key, False) or bool(element.get('page_change_detected'))
+    return navigations
+
+def load_duration_history(results_dir="test_results"):
+    """
+    Collect how long each page took to test in previous runs.
+
+    Durations are keyed by page URL rather than test id: test files are numbered
+    in crawl order, so the same id can be another page on another machine or run.
+    A page tested by several tests (e.g. before and after logging in) keeps the
+    longest of their durations.
+
+    Returns:
+        dict: page URL -> duration in seconds of its longest saved run
+    """
+    durations = {}
+    for results_file in glob.glob(os.path.join(results_dir, "element_results_*.json")):
+        try:
+            with open(results_file, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading results file {results_file}: {e}")
+            continue
+        page_url = next((element['page_url'] for element in results.get('elements', [])
+                         if element.get('page_url')), None)
+        if results.get('duration_seconds') is not None and page_url:
+            durations[page_url] = max(durations.get(page_url, 0.0), results['duration_seconds'])
+    return durations
+
+def estimate_test_cost(script, durations):
+    """
+    Find the page a test plan or script tests and estimate its run time in seconds:
+    the duration of the page's last run if there was one, else the page load plus
+    the cost of its steps.
+
+    Args:
+        script: Path of the test plan (.json) or generated script (.py)
+        durations: Output of load_duration_history
+
+    Returns:
+        tuple: (page URL, or None if the test cannot be read, estimated seconds)
+    """
+    try:
+        with open(script, 'r', encoding='utf-8') as f:
+            if script.endswith('.json'):
+                plan = json.load(f)
+                page_url = plan.get('url')
+                cost = PAGE_LOAD_COST_SECONDS + sum(
+                    ACTION_COST_SECONDS.get(step.get('action'), DEFAULT_ACTION_COST_SECONDS)
+                    for step in plan.get('steps', []))
+            else:
+                source = f.read()
+                match = TEST_URL_PATTERN.search(source)
+                page_url = match.group(1) if match else None
+                # Generated scripts inline the recording of each element
+                cost = PAGE_LOAD_COST_SECONDS + source.count('record_element_test(') * DEFAULT_ACTION_COST_SECONDS
+    except (OSError, ValueError) as e:
+        print(f"Error reading test {script}: {e}")
+        return None, PAGE_LOAD_COST_SECONDS
+    return page_url, durations.get(page_url, cost)
+
+def test_page_url(script):
+    """URL of the page a test plan or script tests, or None if it cannot be read"""
+    return estimate_test_cost(script, {})[0]
+
+def count_selector_pages(page_steps):
+    """Count on how many pages each (role, selector) pair is tested"""
+    counts = {}
+    for steps in page_steps:
+        for key in {(step['role'], step['selector']) for step in steps}:
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+def score_step(step, page_url, selector_page_counts, failures):
+    """
+    Score the expected value of testing a step's element.
+
+    The score combines the element's role, whether its selector is semantic and
+    unique, how novel it is across the run's pages, and how often it failed before.
+    """
+    selector = step['selector']
+    score = ROLE_WEIGHTS.get(step['role'], 1.0)
+
+    # Semantic names point at elements someone cared to label
+    if selector.startswith('#') or any(marker in selector for marker in SEMANTIC_SELECTOR_MARKERS):
+        score += 1.0
+    # Structural paths are brittle and mostly reach anonymous containers
+    if ':nth-of-type(' in selector:
+        score -= 1.0
+    if step.get('match_count', 1) != 1:
+        score -= 0.5
+
+    # Elements repeated on many pages add little after the first one
+    pages = selector_page_counts.get((step['role'], selector), 1)
+    score += 2.0 / pages
+
+    # Past failures are worth re-checking first
+    score += min(failures.get((page_url, selector), 0), 3) * 1.5
+    return score
+
+def prioritize_steps(steps, page_url, selector_page_counts, failures, max_steps=None, time_budget=None):
+    """
+    Order a page's steps by score and cut them to the page's budget.
+
+    Args:
+        steps: Test plan steps of the page
+        page_url: URL of the page
+        selector_page_counts: Output of count_selector_pages for the run
+        failures: Output of load_failure_history
+        max_steps: Maximum number of steps kept (None for no limit)
+        time_budget: Maximum estimated run time of the kept steps in seconds (None for no limit)
+
+    Returns:
+        tuple: (kept steps, highest score first, number of steps over budget)
+    """
+    # Ties keep the generator's role order
+    ranked = sorted(enumerate(steps),
+                    key=lambda item: (-score_step(item[1], page_url, selector_page_counts, failures), item[0]))
+
+    kept = []
+    elapsed = 0.0
+    for _, step in ranked:
+        if max_steps is not None and len(kept) >= max_steps:
+            break
+        cost = ACTION_COST_SECONDS.get(step['action'], DEFAULT_ACTION_COST_SECONDS)
+        if time_budget is not None and elapsed + cost > time_budget:
+            continue
+        kept.append(step)
+        elapsed += cost
+    return kept, len(steps) - len(kept)
@@ -0,0 +1,181 @@
+import sys
+
+# Element attributes copied into records, mapped to the slot holding each
+ATTRIBUTE_SLOTS = {
+    'id': 'id',
+    'class': 'class_',
+    'name': 'name',
+    'type': 'type',
+    'value': 'value',
+    'placeholder': 'placeholder',
+    'href': 'href',
+    'aria-label': 'aria_label',
+    'data-testid': 'data_testid',
+    'data-cy': 'data_cy',
+    'data-qa': 'data_qa',
+    'role': 'role',
+    'title': 'title',
+    'alt': 'alt'
+}
+
+# Keys stored under their own name
+FIELD_SLOTS = ('tag', 'text', 'action', 'selector', 'node', 'match_count', 'component', 'dom_path',
+               'bbox', 'visible', 'hidden_reason', 'obscured')
+
+# Keys derived from the node on access for structural button selectors
+LAZY_KEYS = ('position', 'parent_id', 'parent_class', 'parent_tag', 'grandparent_id', 'grandparent_class',
+             'grandparent_tag', 'absolute_position', 'has_svg', 'svg_path', 'onclick', 'onmousedown')
+
+# Element text kept per record; selectors and descriptions use at most the first 100 characters
+MAX_TEXT_LENGTH = 500
+
+def _class_string(node):
+    """Interned class attribute of a node, as a space-separated string"""
+    classes = node.get('class') if node is not None else None
+    if not classes:
+        return ''
+    return sys.intern(' '.join(sys.intern(cls) for cls in classes))
+
+class ElementRecord:
+    """
+    Compact record of an element found by the generator.
+
+    Behaves like the element_info dicts it replaces (record['text'],
+    record.get('aria-label'), 'hidden_reason' in record), but keeps its fields
+    in slots, interns the tag, role, action and class strings shared by many
+    elements, caps the text, and derives the parent, grandparent and position
+    data of structural button selectors from the node only when asked for.
+    Unset fields behave like missing dict keys.
+    """
+
+    __slots__ = tuple(ATTRIBUTE_SLOTS.values()) + FIELD_SLOTS + ('structural',)
+
+    def __init__(self, structural=False, **fields):
+        self.structural = structural
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_node(cls, node, tag, action, text=None, structural=False, **overrides):
+        """
+        Build a record from a parsed element with all attributes the selectors use.
+
+        Args:
+            node: The BeautifulSoup element
+            tag: Tag name recorded for the element
+            action: Action the step performs on the element
+            text: Text of the element (defaults to its stripped text content)
+            structural: Derive parent, grandparent and position data for button selectors
+            overrides: Fields replacing the values read from the node
+        """
+        record = cls(structural=structural, tag=tag, action=action, selector=None, node=node,
+                     text=node.get_text().strip() if text is None else text)
+        for key in ATTRIBUTE_SLOTS:
+            if key == 'class':
+                record.class_ = _class_string(node)
+            else:
+                record[key] = node.get(key, '')
+        for key, value in overrides.items():
+            record[key] = value
+        return record
+
+    def _slot(self, key):
+        slot = ATTRIBUTE_SLOTS.get(key)
+        if slot is None and key in FIELD_SLOTS:
+            slot = key
+        return slot
+
+    def _lazy(self, key):
+        """Derive a structural field from the node, raising KeyError when it is not available"""
+        node = getattr(self, 'node', None)
+        if not self.structural or node is None:
+            raise KeyError(key)
+        parent = node.parent
+        grandparent = parent.parent if parent else None
+        if key in ('onclick', 'onmousedown'):
+            return node.get(key, '')
+        if key == 'parent_id':
+            return parent.get('id', '') if parent else ''
+        if key == 'parent_class':
+            return _class_string(parent)
+        if key == 'parent_tag':
+            return parent.name if parent else ''
+        if key == 'grandparent_id':
+            return grandparent.get('id', '') if grandparent else ''
+        if key == 'grandparent_class':
+            return _class_string(grandparent)
+        if key == 'grandparent_tag':
+            return grandparent.name if grandparent else ''
+        if key == 'position':
+            # Position among same-tag siblings
+            position = 1
+            if parent:
+                for sibling in parent.find_all(recursive=False):
+                    if sibling == node:
+                        break
+                    if sibling.name == node.name:
+                        position += 1
+            return position
+        if key == 'absolute_position':
+            # Position path among all siblings from the root
+            absolute_position = []
+            current = node
+            while current and current.parent:
+                pos = 1
+                for sibling in current.parent.find_all(recursive=False):
+                    if sibling == current:
+                        break
+                    pos += 1
+                absolute_position.insert(0, (current.name, pos))
+                current = current.parent
+            return absolute_position
+        svg = node.find('svg')
+        if key == 'has_svg':
+            return bool(svg)
+        # svg_path: the beginning of the first svg path, only present when there is one
+        path = svg.find('path') if svg else None
+        if path and path.get('d'):
+            return path.get('d')[:20]
+        raise KeyError(key)
+
+    def __getitem__(self, key):
+        slot = self._slot(key)
+        if slot is None:
+            if key in LAZY_KEYS:
+                return self._lazy(key)
+            raise KeyError(key)
+        try:
+            return getattr(self, slot)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        slot = self._slot(key)
+        if slot is None:
+            raise KeyError(f"ElementRecord has no field {key!r}")
+        if key in ('tag', 'role', 'action') and isinstance(value, str):
+            value = sys.intern(value)
+        elif key == 'class' and isinstance(value, str):
+            value = sys.intern(value)
+        elif key == 'text' and isinstance(value, str):
+            value = value[:MAX_TEXT_LENGTH]
+        setattr(self, slot, value)
+
+    def __iter__(self):
+        """Iterate over the keys that are set, like a dict (lazy keys are not included)"""
+        for key in ('tag',) + tuple(ATTRIBUTE_SLOTS) + FIELD_SLOTS[1:]:
+            if hasattr(self, self._slot(key)):
+                yield key
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
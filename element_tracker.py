@@ -1,22 +1,72 @@
 import os
 import json
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+# Environment variable naming the results file of trackers created without a test id,
+# set by the executor so each script writes to its own file
+RESULTS_ID_ENV = "ELEMENT_RESULTS_ID"
+
+# Lists collecting the trackers created inside collect_trackers() blocks
+_collectors = []
+
+# Callables passed every record as it is made, inside watch_records() blocks
+_record_listeners = []
+
+@contextmanager
+def collect_trackers():
+    """
+    Collect the ElementTrackers created inside the block, e.g. by a generated
+    test script, so their records can be read without a results file.
+    """
+    trackers = []
+    _collectors.append(trackers)
+    try:
+        yield trackers
+    finally:
+        _collectors.remove(trackers)
+
+@contextmanager
+def watch_records(listener):
+    """
+    Pass every record any ElementTracker makes inside the block to listener(record),
+    e.g. to stream a test's records out of a worker process as they are made.
+    """
+    _record_listeners.append(listener)
+    try:
+        yield
+    finally:
+        _record_listeners.remove(listener)
+
 class ElementTracker:
     """
     Tracks the effectiveness of UI elements during testing.
     Records whether elements are working properly based on their expected behavior.
     """
 
-    def __init__(self, output_dir="test_results"):
+    def __init__(self, output_dir="test_results", test_id=None):
+        """
+        Args:
+            output_dir: Directory the results file is saved to
+            test_id: Names the results file (element_results_<test_id>.json); defaults to
+                the ELEMENT_RESULTS_ID environment variable, then to the current time
+        """
         self.output_dir = output_dir
         self.elements = []
-        self.test_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Run statistics saved with the results (e.g. reloads performed and avoided)
+        self.stats = {}
+        # Start of the test, for the duration saved with the results (used to balance shards)
+        self.started_at = time.monotonic()
+        for collector in _collectors:
+            collector.append(self)
+        self.test_id = test_id or os.environ.get(RESULTS_ID_ENV) or datetime.now().strftime("%Y%m%d_%H%M%S")
         os.makedirs(output_dir, exist_ok=True)
 
     def record_element_test(self, page_url, element_type, selector, description="",
                            success=False, error_message=None, screenshot_before=None,
-                           screenshot_after=None, page_change_detected=False, visual_change_detected=None):
+                           screenshot_after=None, page_change_detected=False, visual_change_detected=None,
+                           component=None, skipped=False):
         """
         Record the result of testing an element
 
@@ -31,6 +81,9 @@ class ElementTracker:
             screenshot_after: Path to screenshot after interaction
             page_change_detected: Whether the page changed after interaction (URL or title)
             visual_change_detected: Whether visual changes were detected (optional)
+            component: Id of the shared component (header, nav...) the element belongs to (optional)
+            skipped: Whether the step was skipped without interacting because its target was
+                missing, hidden or disabled when probed (error_message holds the reason)
         """
         # BALANCED APPROACH: More accurate detection of working elements
         # Default assumption based on interaction success
@@ -170,6 +223,10 @@ class ElementTracker:
             if success and (page_change_detected or visual_change_detected is not False):
                 is_working = True
 
+        # Skipped steps never reached their element, so nothing shows it works
+        if skipped:
+            is_working = False
+
         element_result = {
             'page_url': page_url,
             'element_type': element_type,
@@ -184,18 +241,28 @@ class ElementTracker:
             'visual_change_detected': visual_change_detected,
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
+        if component:
+            element_result['component'] = component
+        if skipped:
+            element_result['skipped'] = True
 
         self.elements.append(element_result)
+        for listener in _record_listeners:
+            listener(element_result)
 
     def save_results(self):
         """Save the element tracking results to a JSON file"""
         output_file = os.path.join(self.output_dir, f"element_results_{self.test_id}.json")
+        results = {
+            'test_id': self.test_id,
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'duration_seconds': round(time.monotonic() - self.started_at, 1),
+            'elements': self.elements
+        }
+        if self.stats:
+            results['stats'] = self.stats
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'test_id': self.test_id,
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'elements': self.elements
-            }, f, indent=2)
+            json.dump(results, f, indent=2)
         return output_file
 
     def get_summary(self):
@@ -203,6 +270,7 @@ class ElementTracker:
         total = len(self.elements)
         successful = sum(1 for e in self.elements if e['success'])
         working = sum(1 for e in self.elements if e['is_working'])
+        skipped = sum(1 for e in self.elements if e.get('skipped'))
 
         by_type = {}
         for element in self.elements:
@@ -223,5 +291,6 @@ class ElementTracker:
             'total': total,
             'successful': successful,
             'working': working,
+            'skipped': skipped,
             'by_type': by_type
         }
@@ -0,0 +1,49 @@
+import os
+import json
+import hashlib
+
+class GenerationCache:
+    """
+    Persistent cache of generated test steps.
+    Entries are keyed by the hash of the optimized page HTML together with a
+    fingerprint of the generator, so any change to the generator code
+    invalidates every entry it produced.
+    """
+
+    def __init__(self, cache_dir=".generation_cache", fingerprint=""):
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, optimized_html, output_format, extra=""):
+        """Build the cache key for a page's optimized HTML"""
+        digest = hashlib.sha256()
+        for part in (self.fingerprint, output_format, extra, optimized_html):
+            digest.update(part.encode('utf-8', errors='replace'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        # Shard entries into subdirectories to keep directory listings small
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached steps for a key, or None on a miss"""
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)['steps']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, steps):
+        """Store the generated steps for a key"""
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        # Write to a temporary file first so concurrent workers never read a partial entry
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'steps': steps}, f, separators=(',', ':'))
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            print(f"Error writing generation cache entry: {e}")
@@ -0,0 +1,152 @@
+import re
+from html import escape
+from html.parser import HTMLParser
+
+# Elements dropped with their whole subtree before the tree is built
+DROPPED_SUBTREE_TAGS = ('script', 'style', 'svg')
+
+# Void elements dropped on their own
+DROPPED_VOID_TAGS = ('meta', 'link')
+
+# Elements whose content is raw text, never markup
+RAW_TEXT_TAGS = ('script', 'style', 'textarea', 'title')
+
+# Attributes the generator builds selectors from (see RoleBasedTestGenerator._selector_candidates),
+# which are always kept verbatim so selectors match the live page
+SELECTOR_ATTRIBUTES = {
+    'id', 'class', 'data-testid', 'data-cy', 'data-qa', 'name', 'aria-label', 'placeholder',
+    'title', 'alt', 'href', 'type', 'role', 'value'
+}
+
+# Longest data URI kept inside other attributes, and longest value of other attributes
+MAX_DATA_URI_LENGTH = 64
+MAX_ATTRIBUTE_LENGTH = 1024
+
+# Attributes only their data URIs are capped in: a style cut short could lose the
+# display:none or visibility:hidden that prunes an element as hidden
+UNTRUNCATED_ATTRIBUTES = {'style'}
+
+# Comments, and start or end tags with their (possibly quoted) attributes
+TOKEN_PATTERN = re.compile(r'<!--.*?-->|<(/?)([a-zA-Z][^\s/>]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>', re.DOTALL)
+SVG_TAG_PATTERN = re.compile(r'<(/?)svg(?=[\s/>])((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>', re.IGNORECASE)
+DATA_URI_PATTERN = re.compile(r'data:[^\s"\')]{%d,}' % (MAX_DATA_URI_LENGTH + 1))
+RAW_TEXT_END_PATTERNS = {tag: re.compile(r'</%s\s*>' % tag, re.IGNORECASE) for tag in RAW_TEXT_TAGS}
+
+class _StartTagParser(HTMLParser):
+    """Parses the attributes of a single start tag"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.attrs = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.attrs is None:
+            self.attrs = attrs
+
+    handle_startendtag = handle_starttag
+
+def _cap_start_tag(tag_text, tag_name):
+    """Return the start tag with long data URIs and oversized attribute values capped, or None if unchanged"""
+    parser = _StartTagParser()
+    parser.feed(tag_text)
+    parser.close()
+    if not parser.attrs:
+        return None
+
+    capped = []
+    changed = False
+    for name, value in parser.attrs:
+        if value is not None and name not in SELECTOR_ATTRIBUTES:
+            new_value = DATA_URI_PATTERN.sub(lambda match: match.group(0)[:MAX_DATA_URI_LENGTH], value)
+            if name not in UNTRUNCATED_ATTRIBUTES:
+                new_value = new_value[:MAX_ATTRIBUTE_LENGTH]
+            if new_value != value:
+                changed = True
+                value = new_value
+        capped.append((name, value))
+    if not changed:
+        return None
+    rendered = ''.join(f' {name}' if value is None else f' {name}="{escape(value, quote=True)}"'
+                       for name, value in capped)
+    return f"<{tag_name}{rendered}{' /' if tag_text.endswith('/>') else ''}>"
+
+def prefilter_html(html, stats=None):
+    """
+    Streaming pass over page HTML that cuts out the subtrees the generator throws
+    away (scripts, styles, svgs) and the meta and link tags, so they are never
+    built into a tree, and caps long data URIs and oversized attribute values
+    (inline state, svg path data). Only tags are tokenized; everything else is
+    copied through verbatim, so parsing the output gives the same elements as
+    parsing the input and decomposing the dropped ones.
+
+    Args:
+        html: Page HTML
+        stats: Optional dict updated with 'dropped_elements' and 'capped_tags' counts
+
+    Returns:
+        str: The filtered HTML
+    """
+    parts = []
+    dropped_elements = 0
+    capped_tags = 0
+    pos = 0
+    while True:
+        match = TOKEN_PATTERN.search(html, pos)
+        if not match:
+            parts.append(html[pos:])
+            break
+        tag_name = (match.group(2) or '').lower()
+        closing = match.group(1) == '/'
+        end = match.end()
+        if not tag_name:
+            # Comment, copied as is
+            parts.append(html[pos:end])
+        elif closing:
+            # End tags of dropped void elements are dropped too
+            parts.append(html[pos:match.start() if tag_name in DROPPED_VOID_TAGS else end])
+        elif tag_name in DROPPED_VOID_TAGS:
+            parts.append(html[pos:match.start()])
+            dropped_elements += 1
+        elif tag_name == 'svg':
+            parts.append(html[pos:match.start()])
+            dropped_elements += 1
+            if not match.group(0).endswith('/>'):
+                # Skip to the matching end tag, counting nested svgs
+                depth = 1
+                while depth:
+                    svg_match = SVG_TAG_PATTERN.search(html, end)
+                    if not svg_match:
+                        end = len(html)
+                        break
+                    end = svg_match.end()
+                    if svg_match.group(1):
+                        depth -= 1
+                    elif not svg_match.group(0).endswith('/>'):
+                        depth += 1
+        elif tag_name in RAW_TEXT_TAGS:
+            # Raw text can contain anything that looks like markup, so jump to the end tag
+            raw_end = RAW_TEXT_END_PATTERNS[tag_name].search(html, end)
+            raw_end = raw_end.end() if raw_end else len(html)
+            if tag_name in DROPPED_SUBTREE_TAGS:
+                parts.append(html[pos:match.start()])
+                dropped_elements += 1
+            else:
+                parts.append(html[pos:raw_end])
+            end = raw_end
+        else:
+            tag_text = match.group(0)
+            capped = None
+            if len(tag_text) > MAX_DATA_URI_LENGTH and ('data:' in tag_text or len(tag_text) > MAX_ATTRIBUTE_LENGTH):
+                capped = _cap_start_tag(tag_text, tag_name)
+            if capped is None:
+                parts.append(html[pos:end])
+            else:
+                parts.append(html[pos:match.start()])
+                parts.append(capped)
+                capped_tags += 1
+        pos = end
+
+    if stats is not None:
+        stats['dropped_elements'] = stats.get('dropped_elements', 0) + dropped_elements
+        stats['capped_tags'] = stats.get('capped_tags', 0) + capped_tags
+    return ''.join(parts)
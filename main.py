@@ -1,34 +1,97 @@
+import os
 import sys
 from crawler import crawl_website_and_screenshot
 from template_generator import generate_tests_with_templates
 from test_executor import execute_tests
 from reporter import generate_report
+from test_shards import save_shard_results
+from test_rerun import rerun_failures, save_last_run
+from plan_steps import DEBUG_SCREENSHOTS_ENV
 
-def main(base_url, visual_mode=False):
+def main(base_url, visual_mode=False, max_steps_per_page=None, time_budget_per_page=None, inventory_backend="dom",
+         workers=1, async_pages=0, timeout=None, shard=None, manifest=None):
     print(f"[1/5] Crawling and screenshotting {base_url}...")
-    pages = crawl_website_and_screenshot(base_url)
+    pages = crawl_website_and_screenshot(base_url, inventory_backend=inventory_backend)
     print(f"[2/5] Generating tests with role-based templates...")
-    test_scripts = generate_tests_with_templates(pages)
+    test_scripts = generate_tests_with_templates(pages, max_steps_per_page=max_steps_per_page,
+                                                 time_budget_per_page=time_budget_per_page)
     print(f"[3/5] Executing tests{' in visual mode' if visual_mode else ''}...")
-    results = execute_tests(test_scripts, visual_mode=visual_mode)
+    results = execute_tests(test_scripts, visual_mode=visual_mode, workers=workers, async_pages=async_pages,
+                            timeout=timeout, shard=shard, manifest=manifest)
+    save_last_run(results)
+    if shard:
+        results_path = save_shard_results(results, f"test_results/shard_results_{shard[0]}_of_{shard[1]}.json")
+        print(f"Shard results saved to {results_path} (combine with: python test_shards.py merge)")
     print(f"[4/5] Generating report...")
     generate_report(results)
     print(f"[5/5] Done! Report generated.")
 
+def rerun(visual_mode=False):
+    print(f"[1/2] Rerunning the elements that failed in the last run...")
+    results = rerun_failures(visual_mode=visual_mode)
+    print(f"[2/2] Generating report...")
+    generate_report(results)
+
 if __name__ == "__main__":
     # Check for visual mode flag
     visual_mode = False
     base_url = None
+    max_steps_per_page = None
+    time_budget_per_page = None
+    inventory_backend = "dom"
+    workers = 1
+    async_pages = 0
+    timeout = None
+    shard = None
+    manifest = None
+    rerun_failed = False
     
     for arg in sys.argv[1:]:
         if arg == "--visual" or arg == "-v":
             visual_mode = True
+        elif arg.startswith("--max-steps="):
+            max_steps_per_page = int(arg.split("=", 1)[1])
+        elif arg.startswith("--time-budget="):
+            time_budget_per_page = float(arg.split("=", 1)[1])
+        elif arg == "--accessibility":
+            inventory_backend = "accessibility"
+        elif arg.startswith("--workers="):
+            workers = int(arg.split("=", 1)[1])
+        elif arg.startswith("--async-pages="):
+            async_pages = int(arg.split("=", 1)[1])
+        elif arg.startswith("--timeout="):
+            timeout = float(arg.split("=", 1)[1])
+        elif arg.startswith("--shard="):
+            shard = tuple(int(part) for part in arg.split("=", 1)[1].split("/", 1))
+        elif arg.startswith("--manifest="):
+            manifest = arg.split("=", 1)[1]
+        elif arg == "--rerun-failures":
+            rerun_failed = True
+        elif arg == "--debug":
+            # Read by the runners, including those in worker processes
+            os.environ[DEBUG_SCREENSHOTS_ENV] = "1"
         elif not base_url:  # First non-flag argument is the URL
             base_url = arg
     
+    if rerun_failed:
+        rerun(visual_mode)
+        sys.exit(0)
+
     if not base_url:
-        print("Usage: python main.py <base_url> [--visual|-v]")
+        print("Usage: python main.py <base_url> [--visual|-v] [--max-steps=N] [--time-budget=S] [--accessibility] [--workers=N] [--async-pages=K] [--timeout=S] [--shard=I/N [--manifest=FILE]] [--debug]")
         print("  --visual or -v: Run tests in visual mode (browser will be visible)")
+        print("  --max-steps=N: Test at most N elements per page, highest-scoring first")
+        print("  --time-budget=S: Limit each page's estimated test time to S seconds")
+        print("  --accessibility: Find elements from the browser's accessibility tree instead of CSS heuristics")
+        print("  --workers=N: Run N tests at a time in separate worker processes")
+        print("  --async-pages=K: Run test plans on K concurrent pages of one browser")
+        print("  --timeout=S: Run each test in a supervised worker, killed after S seconds or when it hangs")
+        print("  --shard=I/N: Run only slice I of N of the tests, balanced by their estimated run time")
+        print("  --manifest=FILE: Take the shard slices from a manifest written by test_shards.py")
+        print("  --debug: Keep every step screenshot, not only those of failed steps and steps that changed the page")
+        print("Or:    python main.py --rerun-failures [--visual|-v]")
+        print("  --rerun-failures: Rerun only the elements that failed in the last run and update its results")
         sys.exit(1)
         
-    main(base_url, visual_mode)
\ No newline at end of file
+    main(base_url, visual_mode, max_steps_per_page, time_budget_per_page, inventory_backend, workers, async_pages,
+         timeout, shard, manifest)
\ No newline at end of file
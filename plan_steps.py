@@ -0,0 +1,960 @@
+import io
+import os
+import math
+import time
+import asyncio
+import inspect
+from contextlib import contextmanager
+from datetime import datetime
+from element_priority import load_navigation_history
+
+# Steps of a test plan, shared by the sync runner (test_runner) and the asyncio
+# runner (async_runner) so both produce the same ElementTracker records for a plan.
+
+VIEWPORT = {"width": 1280, "height": 720}
+
+# Roles and actions that may navigate away and need page change detection
+NAVIGATION_ROLES = ('button', 'link', 'form')
+
+# Actions Playwright only performs on visible, enabled elements (after auto-waiting for them)
+ACTIONABLE_ACTIONS = ('click', 'fill', 'check', 'select_option', 'slide', 'toggle')
+
+# Actions that click the element and may therefore navigate
+CLICK_ACTIONS = ('click', 'toggle')
+
+# Field actions a form batch performs in the page, and the values the runner enters
+FORM_FIELD_ACTIONS = ('fill', 'check', 'select_option')
+FILL_VALUE = "test value"
+OPTION_VALUE = '1'
+
+# Step screenshots are diffed in grayscale, shrunk by this factor on each side,
+# a band of this many rows at a time so a clear change stops the diff early
+DIFF_DOWNSAMPLE = 4
+DIFF_BAND_ROWS = 16
+
+# Margin in CSS pixels kept around a step's element region in its screenshots
+REGION_MARGIN = 24
+
+# Environment variable that keeps every step screenshot on disk (debug mode); otherwise
+# only the screenshots of steps that failed or changed the page are written
+DEBUG_SCREENSHOTS_ENV = "RUNNER_DEBUG_SCREENSHOTS"
+
+# Resolves every planned selector in one round trip. Selectors the browser cannot
+# parse (Playwright's :has-text, :nth-match) come back as null and are probed by Playwright.
+PROBE_SCRIPT = """
+selectors => selectors.map(selector => {
+    let elements;
+    try {
+        elements = Array.from(document.querySelectorAll(selector));
+    } catch (e) {
+        return null;
+    }
+    const isVisible = el => {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    const isEnabled = el => !el.matches(':disabled') && !el.closest('[aria-disabled="true"]');
+    const visible = elements.filter(isVisible);
+    const first = visible[0] || elements[0];
+    const anchor = first && first.closest('a[href]');
+    return {
+        count: elements.length,
+        visible: visible.length > 0,
+        enabled: (visible.length ? visible : elements).some(isEnabled),
+        href: anchor ? anchor.href : null,
+        target: anchor ? anchor.target : null,
+        submits: !!(first && first.form && first.matches('button:not([type]), [type="submit"], [type="image"]'))
+    };
+})
+"""
+
+# Counts DOM mutations and remembers the URL from the last reset, so the runner can
+# tell whether an interaction left the page as it was. Reinstalled after every navigation.
+DOM_WATCH_SCRIPT = """
+() => {
+    window.__runnerMutations = 0;
+    window.__runnerUrl = location.href;
+    if (!window.__runnerDomWatch) {
+        window.__runnerDomWatch = new MutationObserver(records => { window.__runnerMutations += records.length; });
+        window.__runnerDomWatch.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    }
+}
+"""
+
+# True when the URL or DOM changed since the last reset, or the watcher is gone because the document was replaced
+DOM_CHANGED_SCRIPT = """
+() => !window.__runnerDomWatch || window.__runnerMutations > 0 || location.href !== window.__runnerUrl
+"""
+
+# Settle: the DOM must be quiet this long, with no request started by the action
+# still pending, before the page counts as settled; never waits longer than the timeout
+SETTLE_QUIET_MS = 50
+SETTLE_TIMEOUT_MS = 3000
+
+# Resolves once no DOM mutation happened for quietMs (or after timeoutMs), with the elapsed time
+QUIET_DOM_SCRIPT = """
+({quietMs, timeoutMs}) => new Promise(resolve => {
+    const start = performance.now();
+    let timer;
+    const finish = () => {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(cap);
+        resolve(performance.now() - start);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(finish, quietMs);
+    });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    timer = setTimeout(finish, quietMs);
+    const cap = setTimeout(finish, timeoutMs);
+})
+"""
+
+# Index in document.forms of the form owning each selector's element; null when the
+# selector does not match exactly one element or the element is outside a form
+FORM_INDEX_SCRIPT = """
+selectors => {
+    const forms = Array.from(document.forms);
+    return selectors.map(selector => {
+        let elements;
+        try {
+            elements = document.querySelectorAll(selector);
+        } catch (e) {
+            return null;
+        }
+        if (elements.length !== 1) return null;
+        const form = elements[0].form || elements[0].closest('form');
+        return form ? forms.indexOf(form) : null;
+    });
+}
+"""
+
+# Fills, checks and selects a form's fields in one round trip, firing the events
+# a user interaction would. Returns an error message per field, or null on success.
+FILL_FORM_SCRIPT = """
+({fields, fillValue, optionValue}) => fields.map(({selector, action}) => {
+    const el = document.querySelector(selector);
+    if (!el) return 'selector resolved to 0 elements';
+    const dispatch = () => {
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+    };
+    try {
+        if (action === 'fill') {
+            el.focus();
+            if (el instanceof HTMLInputElement || el instanceof HTMLTextAreaElement) {
+                if (el instanceof HTMLInputElement && ['checkbox', 'radio', 'file', 'range', 'submit', 'button', 'image', 'reset'].includes(el.type)) {
+                    return `Input of type "${el.type}" cannot be filled`;
+                }
+                // The prototype setter keeps frameworks tracking the value (React) in sync
+                const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+                Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, fillValue);
+            } else if (el.isContentEditable) {
+                el.textContent = fillValue;
+            } else {
+                return 'Element is not an <input>, <textarea> or [contenteditable] element';
+            }
+            dispatch();
+        } else if (action === 'check') {
+            const role = el.getAttribute('role');
+            const native = el instanceof HTMLInputElement && ['checkbox', 'radio'].includes(el.type);
+            if (!native && role !== 'checkbox' && role !== 'radio') return 'Not a checkbox or radio button';
+            const isChecked = () => native ? el.checked : el.getAttribute('aria-checked') === 'true';
+            if (!isChecked()) el.click();
+            if (!isChecked()) return 'Clicking the checkbox did not change its state';
+        } else if (action === 'select_option') {
+            if (!(el instanceof HTMLSelectElement)) return 'Element is not a <select> element';
+            if (!Array.from(el.options).some(option => option.value === optionValue)) {
+                return `No option with value "${optionValue}"`;
+            }
+            el.value = optionValue;
+            dispatch();
+        }
+    } catch (e) {
+        return String(e);
+    }
+    return null;
+})
+"""
+
+# Viewport rectangle around the elements of the selectors, the elements they control
+# (aria-controls, aria-owns) or, for expanded elements naming none, the open popups
+# (menus, listboxes, dialogs), plus a margin. Null when none of them is rendered or a
+# selector cannot be parsed.
+REGION_SCRIPT = """
+({selectors, margin}) => {
+    const rects = [];
+    const add = el => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width > 0 && rect.height > 0) rects.push(rect);
+    };
+    for (const selector of selectors) {
+        let el;
+        try {
+            el = document.querySelector(selector);
+        } catch (e) {
+            return null;
+        }
+        if (!el) continue;
+        add(el);
+        const count = rects.length;
+        const ids = `${el.getAttribute('aria-controls') || ''} ${el.getAttribute('aria-owns') || ''}`;
+        for (const id of ids.split(/\\s+/).filter(Boolean)) {
+            const target = document.getElementById(id);
+            if (target) add(target);
+        }
+        // Popups opened by an element that does not name what it controls
+        if (rects.length === count && el.getAttribute('aria-expanded') === 'true') {
+            document.querySelectorAll('[role="menu"], [role="listbox"], [role="dialog"], [role="tree"], [role="grid"], dialog[open]')
+                .forEach(popup => popup.contains(el) || add(popup));
+        }
+    }
+    if (!rects.length) return null;
+    const left = Math.max(0, Math.min(...rects.map(r => r.left)) - margin);
+    const top = Math.max(0, Math.min(...rects.map(r => r.top)) - margin);
+    const right = Math.min(innerWidth, Math.max(...rects.map(r => r.right)) + margin);
+    const bottom = Math.min(innerHeight, Math.max(...rects.map(r => r.bottom)) + margin);
+    if (right <= left || bottom <= top) return null;
+    return {x: left, y: top, width: right - left, height: bottom - top};
+}
+"""
+
+
+def create_screenshot_dir(screenshots_dir):
+    """Create screenshots directory if it doesn't exist"""
+    if not os.path.exists(screenshots_dir):
+        os.makedirs(screenshots_dir)
+    return screenshots_dir
+
+def detect_page_change(before_url, after_url, before_title, after_title):
+    """Detect if the page has changed after an interaction"""
+    url_changed = before_url != after_url
+    title_changed = before_title != after_title
+    return url_changed or title_changed
+
+def decode_screenshot(png):
+    """Decode PNG bytes into a downsampled grayscale NumPy array (None if they cannot be decoded)"""
+    try:
+        import numpy as np
+        from PIL import Image
+
+        with Image.open(io.BytesIO(png)) as image:
+            gray = image.convert('L')
+        if DIFF_DOWNSAMPLE > 1:
+            gray = gray.reduce(DIFF_DOWNSAMPLE)
+        return np.asarray(gray)
+    except Exception as decode_error:
+        print(f"Error decoding screenshot: {decode_error}")
+        return None
+
+def save_screenshot(capture, name, screenshots_dir):
+    """Write a captured screenshot to a timestamped file and return its path (None without a capture)"""
+    if capture is None:
+        return None
+    create_screenshot_dir(screenshots_dir)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(screenshots_dir, f"{name}_{timestamp}.png")
+    crop = capture.get('crop')
+    if crop:
+        # A whole-viewport capture compared by region; store only the region
+        from PIL import Image
+        with Image.open(io.BytesIO(capture['png'])) as image:
+            image.crop((crop['x'], crop['y'], crop['x'] + crop['width'], crop['y'] + crop['height'])).save(filepath)
+    else:
+        with open(filepath, 'wb') as f:
+            f.write(capture['png'])
+    print(f"Screenshot saved: {filepath}")
+    return filepath
+
+def merge_regions(*regions):
+    """Smallest rectangle containing the given regions (None ones are ignored)"""
+    regions = [region for region in regions if region]
+    if not regions:
+        return None
+    left = min(region['x'] for region in regions)
+    top = min(region['y'] for region in regions)
+    right = max(region['x'] + region['width'] for region in regions)
+    bottom = max(region['y'] + region['height'] for region in regions)
+    return {'x': left, 'y': top, 'width': right - left, 'height': bottom - top}
+
+def align_region(region, viewport):
+    """
+    Widen a region to whole pixels on the diff's downsampling grid, inside the viewport,
+    so a capture clipped to it lines up with the same part of a whole-viewport capture.
+    """
+    if not region:
+        return None
+    viewport = viewport or VIEWPORT
+    grid = DIFF_DOWNSAMPLE
+    left = math.floor(region['x'] / grid) * grid
+    top = math.floor(region['y'] / grid) * grid
+    right = min(viewport['width'], math.ceil((region['x'] + region['width']) / grid) * grid)
+    bottom = min(viewport['height'], math.ceil((region['y'] + region['height']) / grid) * grid)
+    if right <= left or bottom <= top:
+        return None
+    return {'x': left, 'y': top, 'width': right - left, 'height': bottom - top}
+
+def crop_capture(capture, region):
+    """The part of a whole-viewport capture inside an aligned region (see align_region)"""
+    if capture is None or not region:
+        return capture
+    pixels = capture['pixels']
+    if pixels is not None:
+        pixels = pixels[region['y'] // DIFF_DOWNSAMPLE:(region['y'] + region['height']) // DIFF_DOWNSAMPLE,
+                        region['x'] // DIFF_DOWNSAMPLE:(region['x'] + region['width']) // DIFF_DOWNSAMPLE]
+    return {'png': capture['png'], 'pixels': pixels, 'crop': region}
+
+def debug_screenshots():
+    """Whether every step screenshot is kept on disk (see DEBUG_SCREENSHOTS_ENV)"""
+    return os.environ.get(DEBUG_SCREENSHOTS_ENV, '') not in ('', '0')
+
+def _screenshot_pixels(screenshot):
+    """Diff pixels of a capture, or of a saved screenshot file"""
+    if isinstance(screenshot, dict):
+        return screenshot['pixels']
+    if screenshot and os.path.exists(screenshot):
+        with open(screenshot, 'rb') as f:
+            return decode_screenshot(f.read())
+    return None
+
+def detect_visual_change(before_screenshot, after_screenshot, threshold=0.05):
+    """Detect if there are visual changes between two screenshots
+
+    Args:
+        before_screenshot: Capture (see capture_screenshot) or path of the screenshot before interaction
+        after_screenshot: Capture or path of the screenshot after interaction
+        threshold: Mean grayscale difference (0.0-1.0) to consider as a change
+
+    Returns:
+        bool: True if visual changes detected, False otherwise
+    """
+    try:
+        import numpy as np
+
+        before = _screenshot_pixels(before_screenshot)
+        after = _screenshot_pixels(after_screenshot)
+        if before is None or after is None:
+            return False
+
+        # Ensure both images are the same size
+        if before.shape != after.shape:
+            from PIL import Image
+            after = np.asarray(Image.fromarray(after).resize((before.shape[1], before.shape[0])))
+
+        # Sum the differences band by band and stop as soon as the total crosses the threshold
+        limit = threshold * before.size * 255
+        total = 0
+        for start in range(0, before.shape[0], DIFF_BAND_ROWS):
+            band = slice(start, start + DIFF_BAND_ROWS)
+            total += int(np.abs(before[band].astype(np.int16) - after[band]).sum())
+            if total > limit:
+                return True
+        return False
+    except Exception as visual_error:
+        print(f"Error detecting visual changes: {visual_error}")
+        return None  # Return None to indicate error
+
+def skip_reason(step, probe):
+    """Reason for skipping a step whose target the probe found unusable, or None to run it"""
+    if probe is None:
+        return None
+    if probe['count'] == 0:
+        return "Skipped: selector resolved to 0 elements"
+    if step['action'] in ACTIONABLE_ACTIONS:
+        if not probe['visible']:
+            return "Skipped: element is not visible"
+        if not probe['enabled']:
+            return "Skipped: element is not enabled"
+    return None
+
+def classify_step(step, probe, page_url, navigation_history, plan_url=None):
+    """
+    Classify a step as 'navigating' or 'state-preserving'.
+
+    Only submits and clicks can navigate. A click is classified by what earlier
+    runs observed for the element, then by its target: submit buttons of a form
+    and links to another document (not a fragment of this page, not a new tab)
+    navigate.
+
+    Args:
+        step: Test plan step
+        probe: The step's probe result (see probe_selectors)
+        page_url: URL the page actually loaded at, compared with link targets
+        navigation_history: Output of load_navigation_history
+        plan_url: URL of the plan, which records (and so the history) are keyed by;
+            defaults to page_url
+    """
+    action = step['action']
+    if action == 'submit':
+        return 'navigating'
+    if action not in CLICK_ACTIONS:
+        return 'state-preserving'
+    navigated = navigation_history.get((plan_url or page_url, step['selector']))
+    if navigated is not None:
+        return 'navigating' if navigated else 'state-preserving'
+    if probe:
+        if probe.get('submits'):
+            return 'navigating'
+        href = probe.get('href')
+        if (href and not href.startswith('javascript:') and probe.get('target') != '_blank'
+                and href.split('#')[0] != page_url.split('#')[0]):
+            return 'navigating'
+    return 'state-preserving'
+
+def execution_order(steps, probes, page_url, navigation_history, plan_url=None):
+    """
+    Order step indexes so state-preserving steps run before navigating ones, each group in plan order.
+    page_url and plan_url are passed to classify_step.
+
+    Returns:
+        tuple: (step indexes in execution order, number of navigating steps)
+    """
+    navigating = [classify_step(step, probes.get(step['selector']), page_url, navigation_history,
+                                plan_url) == 'navigating'
+                  for step in steps]
+    return sorted(range(len(steps)), key=lambda step_index: navigating[step_index]), sum(navigating)
+
+def record_skipped_step(element_tracker, page_url, step, reason):
+    """Record a step that was not run because its target was missing, hidden or disabled"""
+    print(f"{reason}: {step['description']}")
+    element_tracker.record_element_test(
+        page_url=page_url,
+        element_type=step['role'],
+        selector=step['selector'],
+        description=step['description'],
+        success=False,
+        error_message=reason,
+        component=step.get('component'),
+        skipped=True
+    )
+
+def record_page_error(element_tracker, page_url, description, error):
+    """Record a failed check of the page itself (navigation, title)"""
+    element_tracker.record_element_test(
+        page_url=page_url,
+        element_type="page",
+        selector="N/A",
+        description=description,
+        success=False,
+        error_message=str(error)
+    )
+
+@contextmanager
+def triggered_requests(page):
+    """Collect the requests started inside the block that have not finished or failed yet"""
+    pending = set()
+
+    def on_request(request):
+        pending.add(request)
+
+    def on_request_done(request):
+        pending.discard(request)
+
+    page.on('request', on_request)
+    page.on('requestfinished', on_request_done)
+    page.on('requestfailed', on_request_done)
+    try:
+        yield pending
+    finally:
+        page.remove_listener('request', on_request)
+        page.remove_listener('requestfinished', on_request_done)
+        page.remove_listener('requestfailed', on_request_done)
+
+def form_field_steps(indexed_steps):
+    """The (step index, step) pairs whose action a form batch can perform"""
+    return [(step_index, step) for step_index, step in indexed_steps if step['action'] in FORM_FIELD_ACTIONS]
+
+def batch_form_fields(fields, form_indexes):
+    """Group field steps by form index (see FORM_INDEX_SCRIPT), keeping forms with at least two fields"""
+    forms = {}
+    for field, form_index in zip(fields, form_indexes):
+        if form_index is not None:
+            forms.setdefault(form_index, []).append(field)
+    return {batch[0][0]: batch for batch in forms.values() if len(batch) >= 2}
+
+
+# Page procedures. Each is a generator that yields the page calls it makes, as
+# functions without arguments, and gets their results back; run_sync drives it
+# with Playwright's sync API and run_async with its async API. Written once, the
+# steps run, settle, restore and record the same way in both runners.
+
+class CpuWork:
+    """CPU-bound work a procedure yields; run_async runs it in a thread, off the event loop"""
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+
+    def __call__(self):
+        return self.function(*self.args)
+
+def run_sync(procedure):
+    """
+    Run a page procedure with Playwright's sync API.
+
+    Each yielded call is made and its result sent back; an exception it raises is
+    thrown into the procedure at the yield.
+
+    Returns:
+        The procedure's return value
+    """
+    try:
+        value, error = None, None
+        while True:
+            try:
+                call = procedure.throw(error) if error is not None else procedure.send(value)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                value, error = call(), None
+            except Exception as e:
+                value, error = None, e
+    finally:
+        procedure.close()
+
+async def run_async(procedure):
+    """Run a page procedure with Playwright's async API, awaiting its calls (see run_sync)"""
+    try:
+        value, error = None, None
+        while True:
+            try:
+                call = procedure.throw(error) if error is not None else procedure.send(value)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                if isinstance(call, CpuWork):
+                    value = await asyncio.to_thread(call)
+                else:
+                    value = call()
+                    if inspect.isawaitable(value):
+                        value = await value
+                error = None
+            except Exception as e:
+                value, error = None, e
+    finally:
+        procedure.close()
+
+def take_screenshot(page, name, screenshots_dir):
+    """Take a screenshot and save it with timestamp"""
+    create_screenshot_dir(screenshots_dir)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{name}_{timestamp}.png"
+    filepath = os.path.join(screenshots_dir, filename)
+    yield lambda: page.screenshot(path=filepath)
+    print(f"Screenshot saved: {filepath}")
+    return filepath
+
+def capture_screenshot(page, region=None):
+    """
+    Take a screenshot in memory.
+
+    Args:
+        page: Page to capture
+        region: Viewport rectangle (x, y, width, height) to clip to, None for the whole viewport
+
+    Returns:
+        dict: 'png' (the PNG bytes, written to disk only if the step needs them) and
+            'pixels' (the image decoded once for detect_visual_change)
+    """
+    png = yield (lambda: page.screenshot(clip=region)) if region else page.screenshot
+    pixels = yield CpuWork(decode_screenshot, png)
+    return {'png': png, 'pixels': pixels}
+
+def save_step_screenshots(page, before, after, name, screenshots_dir):
+    """
+    Write a step's captures to disk, capturing the current page as the after
+    screenshot if the step failed before taking one.
+
+    Returns:
+        tuple: (before path, after path), None for captures that could not be taken
+    """
+    if after is None:
+        try:
+            after = yield from capture_screenshot(page)
+        except Exception as capture_error:
+            print(f"Error capturing screenshot: {capture_error}")
+    return (save_screenshot(before, f'{name}_before', screenshots_dir),
+            save_screenshot(after, f'{name}_after', screenshots_dir))
+
+def probe_selectors(page, selectors):
+    """
+    Resolve selectors on the current page without waiting for them.
+
+    Returns:
+        dict: selector -> {'count', 'visible', 'enabled'}, or None when the probe failed
+    """
+    selectors = list(dict.fromkeys(selectors))
+    try:
+        results = yield lambda: page.evaluate(PROBE_SCRIPT, selectors)
+    except Exception as e:
+        print(f"Error probing selectors: {e}")
+        results = [None] * len(selectors)
+
+    probes = {}
+    for selector, result in zip(selectors, results):
+        if result is None:
+            # Playwright selector syntax: count() and the state checks return immediately
+            try:
+                locator = page.locator(selector)
+                count = yield locator.count
+                result = {'count': count, 'visible': False, 'enabled': False}
+                if count:
+                    result['visible'] = yield locator.first.is_visible
+                    result['enabled'] = yield lambda: locator.first.is_enabled(timeout=1000)
+            except Exception as e:
+                print(f"Error probing selector {selector}: {e}")
+        probes[selector] = result
+    return probes
+
+def watch_dom(page):
+    """Start (or restart) counting DOM mutations on the page"""
+    try:
+        yield lambda: page.evaluate(DOM_WATCH_SCRIPT)
+    except Exception as e:
+        print(f'Error watching DOM changes: {e}')
+
+def step_region(page, selectors, margin=REGION_MARGIN):
+    """
+    Viewport region covering a step's elements, the elements they control and the
+    popups they expanded, plus margin (see REGION_SCRIPT); None if it cannot be found.
+    """
+    try:
+        return (yield lambda: page.evaluate(REGION_SCRIPT, {'selectors': selectors, 'margin': margin}))
+    except Exception as e:
+        print(f'Error locating step region: {e}')
+        return None
+
+def settle(page, pending, quiet_ms=SETTLE_QUIET_MS, timeout_ms=SETTLE_TIMEOUT_MS):
+    """
+    Wait until the page settled after an interaction: the DOM was quiet for
+    quiet_ms and none of the pending requests (see triggered_requests) is
+    still running. Waits at most timeout_ms.
+
+    Returns:
+        bool: True if the page settled, False if the timeout was reached
+    """
+    deadline = time.monotonic() + timeout_ms / 1000
+    while True:
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            print(f'Page did not settle within {timeout_ms}ms ({len(pending)} requests pending)')
+            return False
+        try:
+            # Request events are delivered while this waits
+            yield lambda: page.evaluate(QUIET_DOM_SCRIPT, {'quietMs': quiet_ms, 'timeoutMs': remaining_ms})
+        except Exception:
+            # The action navigated and destroyed the document; wait for the next one
+            try:
+                yield lambda: page.wait_for_load_state('domcontentloaded', timeout=max(remaining_ms, 1))
+            except Exception:
+                pass
+            continue
+        if not pending:
+            return True
+
+def restore_page(page, original_url, stats):
+    """
+    Reload the original page if the last interaction changed its URL or DOM.
+
+    Counts performed and avoided reloads in stats. Returns True if it reloaded.
+    """
+    try:
+        changed = yield lambda: page.evaluate(DOM_CHANGED_SCRIPT)
+    except Exception:
+        # The page is mid-navigation or closed; reload to get back to a known state
+        changed = True
+    if not changed:
+        stats['reloads_avoided'] = stats.get('reloads_avoided', 0) + 1
+        return False
+
+    stats['reloads'] = stats.get('reloads', 0) + 1
+    with triggered_requests(page) as pending:
+        yield lambda: page.goto(original_url, timeout=5000)
+        yield from settle(page, pending)
+    return True
+
+def perform_action(page, step):
+    """Perform the planned action for a single step"""
+    locator = page.locator(step['selector'])
+    action = step['action']
+
+    if action == 'click':
+        yield lambda: locator.click(timeout=3000)
+    elif action == 'fill':
+        yield lambda: locator.fill(FILL_VALUE)
+    elif action == 'check':
+        yield locator.check
+    elif action == 'select_option':
+        yield lambda: locator.select_option(value=OPTION_VALUE)
+    elif action == 'detect':
+        yield locator.is_visible
+    elif action == 'submit':
+        yield lambda: locator.evaluate("form => form.submit()")
+    elif action == 'slide':
+        yield lambda: locator.fill('50')
+    elif action == 'toggle':
+        yield locator.click
+    else:
+        raise ValueError(f"Unknown action '{action}' for selector {step['selector']}")
+
+def run_step(page, step, step_index, original_url, element_tracker, screenshots_dir, debug=False,
+             region_margin=REGION_MARGIN):
+    """
+    Run one planned step and record its outcome in the element tracker.
+
+    Clicks and steps that changed the page return to the original page afterwards,
+    but only reload it when its URL or DOM actually changed. The step's screenshots
+    are kept in memory and only written when it failed, changed the page, or in debug mode.
+    """
+    role = step['role']
+    description = step['description']
+    selector = step['selector']
+    tracks_navigation = role in NAVIGATION_ROLES or step['action'] == 'click'
+    before = after = region = None
+
+    try:
+        print(f'Testing {role}: {description}')
+        if region_margin is not None:
+            # Where the element is before the action; its region after it is added below
+            region = yield from step_region(page, [selector], region_margin)
+        # Capture the page before interaction
+        before = yield from capture_screenshot(page)
+        if tracks_navigation:
+            # Record URL and title before interaction
+            before_url = page.url
+            before_title = yield page.title
+            # Count DOM changes made by this interaction only
+            yield from watch_dom(page)
+
+        # Perform the action and wait until the DOM and the requests it triggered are done
+        with triggered_requests(page) as pending:
+            yield from perform_action(page, step)
+            yield from settle(page, pending)
+
+        page_changed = False
+        if tracks_navigation:
+            # Check if the page changed (URL or title)
+            after_url = page.url
+            after_title = yield page.title
+            page_changed = detect_page_change(before_url, after_url, before_title, after_title)
+
+        # Capture the element's region after interaction (with the region it controls or
+        # the popup it opened) and detect visual changes in that region only
+        if region_margin is not None:
+            region = align_region(merge_regions(region, (yield from step_region(page, [selector], region_margin))),
+                                  page.viewport_size)
+            before = crop_capture(before, region)
+        after = yield from capture_screenshot(page, region)
+        visual_changed = yield CpuWork(detect_visual_change, before, after)
+        if visual_changed:
+            print(f'Visual changes detected after interacting with {role}: {description}')
+
+        before_screenshot = after_screenshot = None
+        if visual_changed or page_changed or debug:
+            before_screenshot, after_screenshot = yield from save_step_screenshots(
+                page, before, after, f'{role}_{step_index}', screenshots_dir)
+
+        # Record element effectiveness
+        element_tracker.record_element_test(
+            page_url=original_url,
+            element_type=role,
+            selector=selector,
+            description=description,
+            success=True,  # We got this far without exception
+            screenshot_before=before_screenshot,
+            screenshot_after=after_screenshot,
+            page_change_detected=page_changed,
+            visual_change_detected=visual_changed,
+            component=step.get('component')
+        )
+
+        # Go back to the original page after clicks and page changes, unless nothing changed
+        if page_changed:
+            print(f"Page changed after interaction! New URL: {after_url}")
+        if page_changed or step['action'] == 'click':
+            yield from restore_page(page, original_url, element_tracker.stats)
+    except Exception as e:
+        print(f'Error interacting with {role} element: {e}')
+        before_screenshot, after_screenshot = yield from save_step_screenshots(
+            page, before, after, f'{role}_{step_index}', screenshots_dir)
+        # Record failed interaction
+        element_tracker.record_element_test(
+            page_url=original_url,
+            element_type=role,
+            selector=selector,
+            description=description,
+            success=False,
+            error_message=str(e),
+            screenshot_before=before_screenshot,
+            screenshot_after=after_screenshot,
+            component=step.get('component')
+        )
+
+def group_form_fields(page, indexed_steps):
+    """
+    Group field steps by the form their element belongs to.
+
+    Args:
+        page: Page the steps run on
+        indexed_steps: (step index, step) pairs eligible for batching
+
+    Returns:
+        dict: index of the first step of each batch -> the batch's (step index, step) pairs,
+            for forms with at least two field steps
+    """
+    fields = form_field_steps(indexed_steps)
+    if len(fields) < 2:
+        return {}
+    try:
+        form_indexes = yield lambda: page.evaluate(FORM_INDEX_SCRIPT, [step['selector'] for _, step in fields])
+    except Exception as e:
+        print(f"Error grouping form fields: {e}")
+        return {}
+    return batch_form_fields(fields, form_indexes)
+
+def run_form_batch(page, batch, original_url, element_tracker, screenshots_dir, debug=False,
+                   region_margin=REGION_MARGIN):
+    """Fill a form's fields in one round trip with one settle wait and one before/after capture"""
+    first_index = batch[0][0]
+    print(f'Testing form fields: {len(batch)} fields batched')
+    selectors = [step['selector'] for _, step in batch]
+    before = after = region = None
+    try:
+        if region_margin is not None:
+            region = yield from step_region(page, selectors, region_margin)
+        before = yield from capture_screenshot(page)
+        with triggered_requests(page) as pending:
+            errors = yield lambda: page.evaluate(FILL_FORM_SCRIPT, {
+                'fields': [{'selector': step['selector'], 'action': step['action']} for _, step in batch],
+                'fillValue': FILL_VALUE,
+                'optionValue': OPTION_VALUE
+            })
+            yield from settle(page, pending)
+        if region_margin is not None:
+            region = align_region(merge_regions(region, (yield from step_region(page, selectors, region_margin))),
+                                  page.viewport_size)
+            before = crop_capture(before, region)
+        after = yield from capture_screenshot(page, region)
+        visual_changed = yield CpuWork(detect_visual_change, before, after)
+    except Exception as e:
+        print(f'Error filling form fields: {e}')
+        errors = [str(e)] * len(batch)
+        visual_changed = None
+
+    before_screenshot = after_screenshot = None
+    if visual_changed or debug or any(errors):
+        before_screenshot, after_screenshot = yield from save_step_screenshots(
+            page, before, after, f'form_fields_{first_index}', screenshots_dir)
+
+    # Per-field results sharing the batch's captures
+    for (_, step), error in zip(batch, errors):
+        if error:
+            print(f"Error interacting with {step['role']} element: {error}")
+        element_tracker.record_element_test(
+            page_url=original_url,
+            element_type=step['role'],
+            selector=step['selector'],
+            description=step['description'],
+            success=error is None,
+            error_message=error,
+            screenshot_before=before_screenshot,
+            screenshot_after=after_screenshot,
+            visual_change_detected=visual_changed,
+            component=step.get('component')
+        )
+
+def run_plan_steps(page, plan, element_tracker, output_dir="test_results", screenshots_dir="generated_tests/screenshots",
+                   apply_storage=None, batch_forms=True, debug=False, region_margin=REGION_MARGIN, pause=None):
+    """
+    Navigate a fresh page to a plan's URL and run its steps, recording them in the tracker.
+
+    Args:
+        page: Page of a fresh context, with the saved session's cookies loaded
+        plan: Test plan dict
+        element_tracker: Tracker to record into
+        output_dir: Directory of previous results, read for the navigation history
+        screenshots_dir: Directory where step screenshots are saved
+        apply_storage: Call (given the page) restoring the saved session's storage after
+            navigation, None without a session (session_manager.apply_storage or its async twin)
+        batch_forms: Fill the fields of each form together in one round trip
+        debug: Keep every step screenshot on disk
+        region_margin: Margin of the step screenshot regions; None captures the whole viewport
+        pause: Call made after each step (the pause of visual mode), None for no pause
+
+    State-preserving steps run before navigating ones (see classify_step), each
+    group in plan order, so the page is reloaded as rarely as possible.
+    """
+    url = plan['url']
+    steps = plan['steps']
+
+    # Navigate to the URL with improved error handling
+    print(f"Navigating to {url}")
+    try:
+        yield lambda: page.goto(url, timeout=30000, wait_until="networkidle")
+
+        # Apply localStorage and sessionStorage if session was loaded
+        if apply_storage:
+            yield lambda: apply_storage(page)
+            print("Applied localStorage and sessionStorage from saved session")
+
+        # Take initial screenshot
+        yield from take_screenshot(page, "initial_page", screenshots_dir)
+    except Exception as nav_error:
+        print(f"Error navigating to {url}: {nav_error}")
+        record_page_error(element_tracker, url, "Initial page navigation", nav_error)
+        return
+
+    # Basic assertions with error handling
+    try:
+        title = yield page.title
+        print(f"Page title: {title}")
+        assert title != "", "Page title should not be empty"
+    except Exception as title_error:
+        print(f"Error getting page title: {title_error}")
+        record_page_error(element_tracker, url, "Page title verification", title_error)
+        # Continue with the test despite the error
+
+    # Resolve all planned selectors at once so missing targets never wait for a timeout
+    probes = yield from probe_selectors(page, [step['selector'] for step in steps])
+    reasons = [skip_reason(step, probes[step['selector']]) for step in steps]
+    skipped = sum(1 for reason in reasons if reason)
+    if skipped:
+        print(f"{skipped} of {len(steps)} steps target missing, hidden or disabled elements")
+
+    # Fields of the same form run as one batch at the position of the first one
+    form_batches = {}
+    if batch_forms:
+        form_batches = yield from group_form_fields(
+            page, [(step_index, step) for step_index, step in enumerate(steps) if not reasons[step_index]])
+    batched = {step_index for batch in form_batches.values() for step_index, _ in batch}
+
+    # State-preserving steps first, so navigating ones do not force reloads in between
+    # The history is keyed by the plan URL; the page may have loaded at a redirected one
+    order, navigating = execution_order(steps, probes, page.url, load_navigation_history(output_dir),
+                                        plan_url=url)
+    print(f"{navigating} of {len(steps)} steps classified as navigating")
+
+    # Execute test steps, form fields as one batch at the position of the first one
+    for step_index in order:
+        step = steps[step_index]
+        if step_index in batched:
+            if step_index in form_batches:
+                yield from run_form_batch(page, form_batches[step_index], url, element_tracker, screenshots_dir,
+                                          debug, region_margin)
+                if pause:
+                    yield pause
+            continue
+        probe = probes[step['selector']]
+        reason = skip_reason(step, probe)
+        if reason and probe['count']:
+            # Earlier steps may have revealed or enabled the element
+            probe = (yield from probe_selectors(page, [step['selector']]))[step['selector']]
+            reason = skip_reason(step, probe)
+        if reason:
+            record_skipped_step(element_tracker, url, step, reason)
+            continue
+        yield from run_step(page, step, step_index, url, element_tracker, screenshots_dir, debug, region_margin)
+        if pause:
+            yield pause
@@ -12,6 +12,14 @@ def generate_report(results, out_file="report.html"):
     # Create a structure to store detailed page-level statistics
     pages_stats = []
 
+    # Shared components (header, nav, footer...) are only tested on one representative
+    # page; collect their results so they can be attributed to every page containing them
+    component_results = {}
+    for result in results:
+        for element in result.get('element_results', []):
+            if element.get('component'):
+                component_results.setdefault(element['component'], []).append(element)
+
     for result in results:
         page_stats = {
             'url': result['url'],
@@ -21,7 +29,16 @@ def generate_report(results, out_file="report.html"):
             'non_working_elements': {}
         }
 
-        for element in result.get('element_results', []):
+        page_elements = list(result.get('element_results', []))
+        tested_components = {element.get('component') for element in page_elements}
+        for component in result.get('shared_components', []):
+            if component not in tested_components:
+                for element in component_results.get(component, []):
+                    page_elements.append(dict(element, shared_from=element.get('page_url')))
+
+        for element in page_elements:
+            # Attributed shared component results are already counted on their own page
+            attributed = bool(element.get('shared_from'))
             element_type = element.get('element_type', 'unknown')
             element_description = element.get('description', '')
             element_selector = element.get('selector', '')
@@ -31,25 +48,28 @@ def generate_report(results, out_file="report.html"):
             visual_change_detected = element.get('visual_change_detected', False)
             
             # Count total elements for global stats
-            total_elements += 1
+            if not attributed:
+                total_elements += 1
             
             # Count total elements for page stats
             page_stats['total_elements'] += 1
             
             # Count working elements for global stats
             if is_working:
-                working_elements += 1
+                if not attributed:
+                    working_elements += 1
                 page_stats['working_elements'] += 1
             
             # Count by type for global stats
-            if element_type not in elements_by_type:
-                elements_by_type[element_type] = {
-                    'total': 0,
-                    'working': 0
-                }
-            elements_by_type[element_type]['total'] += 1
-            if is_working:
-                elements_by_type[element_type]['working'] += 1
+            if not attributed:
+                if element_type not in elements_by_type:
+                    elements_by_type[element_type] = {
+                        'total': 0,
+                        'working': 0
+                    }
+                elements_by_type[element_type]['total'] += 1
+                if is_working:
+                    elements_by_type[element_type]['working'] += 1
                 
             # Count by type for page stats
             if element_type not in page_stats['elements_by_type']:
@@ -73,7 +93,8 @@ def generate_report(results, out_file="report.html"):
                     'error_message': error_message,
                     'page_change_detected': page_change_detected,
                     'visual_change_detected': visual_change_detected,
-                    'is_working': is_working
+                    'is_working': is_working,
+                    'shared_from': element.get('shared_from')
                 })
         
         # Add the page stats to the list
@@ -557,6 +578,9 @@ def generate_report(results, out_file="report.html"):
                                                             <div style="background: #f8f9fa; padding: 10px; margin-bottom: 10px; border-radius: 4px; border-left: 3px solid #dc3545;">
                                                                 <div style="font-weight: 600;">{{ element.description or 'No description' }}</div>
                                                                 <div class="element-selector">{{ element.selector|truncate(100) }}</div>
+                                                                {% if element.shared_from %}
+                                                                <div style="color: #6c757d; margin-top: 5px; font-size: 0.9em;">Shared component, tested on {{ element.shared_from }}</div>
+                                                                {% endif %}
                                                                 {% if element.error %}
                                                                 <div style="color: #dc3545; margin-top: 5px; font-size: 0.9em;">{{ element.error|truncate(150) }}</div>
                                                                 {% endif %}
@@ -92,40 +92,78 @@ class SessionManager:
         Returns:
             bool: True if session was loaded successfully
         """
-        # Check if we have any session data (cookies OR localStorage tokens)
-        has_cookies = len(self.session_data.get("cookies", [])) > 0
-        has_tokens = 'access_token' in self.session_data.get("localStorage", {})
-        
-        if not (has_cookies or has_tokens):
-            logging.warning("No saved session available")
+        cookies = self._session_cookies(url)
+        if cookies is None:
             return False
-        
         try:
-            # Check if the URL's domain matches the session domain
-            if url:
-                from urllib.parse import urlparse
-                current_domain = urlparse(url).netloc
-                session_domain = self.session_data.get("domain")
-                
-                if current_domain != session_domain:
-                    logging.warning(f"Domain mismatch: Session is for {session_domain}, but trying to use with {current_domain}")
-                    # Continue anyway, as some cookies might still be valid
-            
             # Add cookies to context if available
-            if has_cookies:
-                context.add_cookies(self.session_data.get("cookies", []))
-                logging.info(f"Loaded {len(self.session_data.get('cookies', []))} cookies from saved session")
-            
-            # If we have localStorage tokens but no cookies, we'll still return True
-            # and rely on apply_storage to set the tokens
-            if has_tokens:
-                logging.info("Session has authentication tokens in localStorage")
-            
+            if cookies:
+                context.add_cookies(cookies)
+                logging.info(f"Loaded {len(cookies)} cookies from saved session")
             return True
         except Exception as e:
             logging.error(f"Error loading session: {e}")
             return False
     
+    async def load_session_async(self, context, url=None):
+        """Load saved session into a browser context of Playwright's async API (see load_session)"""
+        cookies = self._session_cookies(url)
+        if cookies is None:
+            return False
+        try:
+            if cookies:
+                await context.add_cookies(cookies)
+                logging.info(f"Loaded {len(cookies)} cookies from saved session")
+            return True
+        except Exception as e:
+            logging.error(f"Error loading session: {e}")
+            return False
+    
+    def _session_cookies(self, url=None):
+        """Cookies to add to a context for url, or None if no session was saved"""
+        if not self.has_session():
+            logging.warning("No saved session available")
+            return None
+        
+        # Check if the URL's domain matches the session domain
+        if url:
+            from urllib.parse import urlparse
+            current_domain = urlparse(url).netloc
+            session_domain = self.session_data.get("domain")
+            
+            if current_domain != session_domain:
+                logging.warning(f"Domain mismatch: Session is for {session_domain}, but trying to use with {current_domain}")
+                # Continue anyway, as some cookies might still be valid
+        
+        # If we have localStorage tokens but no cookies, the session still loads
+        # and apply_storage sets the tokens
+        if 'access_token' in self.session_data.get("localStorage", {}):
+            logging.info("Session has authentication tokens in localStorage")
+        return self.session_data.get("cookies", [])
+    
+    def has_session(self):
+        """Check whether a session with cookies or a localStorage access token was saved"""
+        return (len(self.session_data.get("cookies", [])) > 0 or
+                'access_token' in self.session_data.get("localStorage", {}))
+
+    def storage_scripts(self):
+        """Build the scripts that restore the saved localStorage and sessionStorage items
+        
+        Returns:
+            list: JavaScript functions to evaluate in the page, one per non-empty storage
+        """
+        scripts = []
+        for storage in ("localStorage", "sessionStorage"):
+            items = self.session_data.get(storage, {})
+            if items:
+                script = ""
+                for key, value in items.items():
+                    # Properly escape single quotes in the value
+                    escaped_value = value.replace("'", "\\'") if isinstance(value, str) else value
+                    script += f"{storage}.setItem('{key}', '{escaped_value}');\n"
+                scripts.append(f"() => {{ {script} }}")
+        return scripts
+
     def apply_storage(self, page):
         """Apply localStorage and sessionStorage to a page
         
@@ -136,32 +174,31 @@ class SessionManager:
             bool: True if storage was applied successfully
         """
         try:
-            # Set localStorage items
-            local_storage = self.session_data.get("localStorage", {})
-            if local_storage:
-                script = ""
-                for key, value in local_storage.items():
-                    # Properly escape single quotes in the value
-                    escaped_value = value.replace("'", "\\'") if isinstance(value, str) else value
-                    script += f"localStorage.setItem('{key}', '{escaped_value}');\n"
-                page.evaluate(f"() => {{ {script} }}")
-            
-            # Set sessionStorage items
-            session_storage = self.session_data.get("sessionStorage", {})
-            if session_storage:
-                script = ""
-                for key, value in session_storage.items():
-                    # Properly escape single quotes in the value
-                    escaped_value = value.replace("'", "\\'") if isinstance(value, str) else value
-                    script += f"sessionStorage.setItem('{key}', '{escaped_value}');\n"
-                page.evaluate(f"() => {{ {script} }}")
-            
-            logging.info(f"Applied {len(local_storage)} localStorage items and {len(session_storage)} sessionStorage items")
+            # Set localStorage and sessionStorage items
+            for script in self.storage_scripts():
+                page.evaluate(script)
+            self._log_storage_applied()
+            return True
+        except Exception as e:
+            logging.error(f"Error applying storage: {e}")
+            return False
+    
+    async def apply_storage_async(self, page):
+        """Apply localStorage and sessionStorage to a page of Playwright's async API (see apply_storage)"""
+        try:
+            for script in self.storage_scripts():
+                await page.evaluate(script)
+            self._log_storage_applied()
             return True
         except Exception as e:
             logging.error(f"Error applying storage: {e}")
             return False
     
+    def _log_storage_applied(self):
+        local_storage = self.session_data.get("localStorage", {})
+        session_storage = self.session_data.get("sessionStorage", {})
+        logging.info(f"Applied {len(local_storage)} localStorage items and {len(session_storage)} sessionStorage items")
+    
     def _get_timestamp(self):
         """Get current timestamp in ISO format"""
         from datetime import datetime
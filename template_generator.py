@@ -1,7 +1,63 @@
 import os
 import re
-from bs4 import BeautifulSoup
+import sys
+import json
+import hashlib
+import inspect
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import soupsieve
+from bs4 import BeautifulSoup, Tag
 from urllib.parse import urlparse
+from generation_cache import GenerationCache
+from html_prefilter import prefilter_html
+from _fallback_detection import _fallback_element_detection
+from element_inventory import load_element_inventory
+from element_priority import load_failure_history, count_selector_pages, prioritize_steps
+from element_record import ElementRecord, ATTRIBUTE_SLOTS
+
+# Keep in sync with test_runner.PLAN_FORMAT_VERSION
+PLAN_FORMAT_VERSION = 1
+
+# A repeated subtree is only treated as a shared component (header, nav, footer,
+# cookie banner...) if it contains at least this many interactive elements
+MIN_COMPONENT_INTERACTIVE_ELEMENTS = 2
+SHARED_INTERACTIVE_TAGS = ('a', 'button', 'input', 'select', 'textarea')
+
+# Actions that hit-test the element's centre, and so fail when it is obscured
+POINTER_ACTIONS = ('click', 'check', 'toggle')
+
+# Inline styles that hide an element without layout information
+HIDDEN_DISPLAY_PATTERN = re.compile(r'display\s*:\s*none', re.IGNORECASE)
+HIDDEN_VISIBILITY_PATTERN = re.compile(r'visibility\s*:\s*(hidden|collapse)', re.IGNORECASE)
+
+# ARIA roles mapped to the generator's (role, action)
+ARIA_ROLE_ACTIONS = {
+    'button': ('button', 'click'),
+    'link': ('link', 'click'),
+    'textbox': ('input', 'fill'),
+    'searchbox': ('input', 'fill'),
+    'spinbutton': ('input', 'fill'),
+    'checkbox': ('checkbox', 'check'),
+    'radio': ('radio', 'check'),
+    'combobox': ('select', 'select_option'),
+    'listbox': ('select', 'select_option'),
+    'tab': ('tab', 'click'),
+    'menuitem': ('menu', 'click'),
+    'menuitemcheckbox': ('menu', 'click'),
+    'menuitemradio': ('menu', 'click'),
+    'treeitem': ('menu', 'click'),
+    'option': ('menu', 'click'),
+    'slider': ('slider', 'slide'),
+    'switch': ('toggle', 'toggle'),
+    'dialog': ('dialog', 'detect'),
+    'alertdialog': ('dialog', 'detect'),
+    'alert': ('alert', 'detect'),
+    'form': ('form', 'submit')
+}
+
+# Playwright's :has-text("...") / :has-text('...') pseudo-class
+HAS_TEXT_PATTERN = re.compile(r""":has-text\(((?:'[^']*')|(?:"(?:[^"\\]|\\.)*"))\)""")
 
 class RoleBasedTestGenerator:
     """
@@ -10,7 +66,15 @@ class RoleBasedTestGenerator:
     test actions based on predefined templates.
     """
 
+    _fallback_element_detection = _fallback_element_detection
+
     def __init__(self):
+        # Per-document cache of selector match counts, see _count_selector_matches
+        self._selector_match_cache = {}
+        # Elements dropped because no candidate selector was unique
+        self._unaddressable_count = 0
+        self._pruned_counts = {}
+
         # Define role-based selectors and actions with expanded coverage for better website compatibility
         self.role_selectors = {
             # Interactive elements - expanded to catch ALL possible buttons
@@ -101,35 +165,17 @@ class RoleBasedTestGenerator:
     def optimize_html(self, html):
         """
         Optimize HTML content for test generation by removing unnecessary elements.
+        Scripts, styles, svgs, meta and link tags are dropped by a streaming pass
+        before the tree is built (see html_prefilter.py).
         """
         try:
-            # Parse HTML
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Remove script tags (not needed for UI testing)
-            for script in soup.find_all('script'):
-                script.decompose()
-
-            # Remove style tags (not needed for UI testing)
-            for style in soup.find_all('style'):
-                style.decompose()
+            # Parse HTML without the subtrees that are not needed for UI testing
+            soup = BeautifulSoup(prefilter_html(html), 'html.parser')
 
             # Remove comments
             for comment in soup.find_all(text=lambda text: isinstance(text, str) and text.strip().startswith('<!--')):
                 comment.extract()
 
-            # Remove meta tags (not needed for UI testing)
-            for meta in soup.find_all('meta'):
-                meta.decompose()
-
-            # Remove link tags (CSS, favicons, etc.)
-            for link in soup.find_all('link'):
-                link.decompose()
-
-            # Remove SVG elements (often decorative)
-            for svg in soup.find_all('svg'):
-                svg.decompose()
-
             # Get the optimized HTML
             return soup
         except Exception as e:
@@ -137,8 +183,14 @@ class RoleBasedTestGenerator:
             # Return original HTML if optimization fails
             return BeautifulSoup(html, 'html.parser')
 
-    def extract_elements_by_role(self, soup):
-        """Extract ABSOLUTELY ALL elements from the HTML without any filtering"""
+    def extract_elements_by_role(self, soup, listener_paths=None):
+        """
+        Extract ABSOLUTELY ALL elements from the HTML without any filtering.
+
+        When the crawl recorded which elements have event listeners (listener_paths,
+        a set of "tag:nth-of-type" DOM paths), the catch-all pass only takes those
+        instead of every remaining element.
+        """
         elements_by_role = {}
         processed_elements = set()  # Track elements we've already processed to avoid duplicates
 
@@ -154,92 +206,12 @@ class RoleBasedTestGenerator:
                 element_id = self._get_element_unique_id(element)
                 processed_elements.add(element_id)
 
-                # Check if the button has SVG content
-                has_svg = bool(element.find('svg'))
-
-                # For all buttons, we need better position tracking
-                # Get parent information for better selectors
-                parent = element.parent
-                parent_id = parent.get('id', '') if parent else ''
-                parent_class = ' '.join(parent.get('class', [])) if parent and parent.get('class') else ''
-                parent_tag = parent.name if parent else ''
-
-                # Get grandparent information for even more specific selectors
-                grandparent = parent.parent if parent else None
-                grandparent_id = grandparent.get('id', '') if grandparent else ''
-                grandparent_class = ' '.join(grandparent.get('class', [])) if grandparent and grandparent.get('class') else ''
-                grandparent_tag = grandparent.name if grandparent else ''
-
-                # Count position among siblings
-                position = 1
-                if parent:
-                    for sibling in parent.find_all(recursive=False):
-                        if sibling == element:
-                            break
-                        if sibling.name == element.name:
-                            position += 1
-
-                # Get the absolute position path for this button
-                # This is a unique identifier based on the DOM structure
-                absolute_position = []
-                current = element
-                while current and current.parent:
-                    siblings = current.parent.find_all(recursive=False)
-                    pos = 1
-                    for sibling in siblings:
-                        if sibling == current:
-                            break
-                        pos += 1
-                    absolute_position.insert(0, (current.name, pos))
-                    current = current.parent
-
-                # For SVG buttons, also store the SVG path if available
-                svg_path = None
-                if has_svg:
-                    svg = element.find('svg')
-                    if svg:
-                        path = svg.find('path')
-                        if path and path.get('d'):
-                            svg_path = path.get('d')[:20]  # Store just the beginning of the path
-
-                element_info = {
-                    'tag': 'button',
-                    'id': element.get('id', ''),
-                    'class': ' '.join(element.get('class', [])) if element.get('class') else '',
-                    'name': element.get('name', ''),
-                    'type': element.get('type', ''),
-                    'value': element.get('value', ''),
-                    'placeholder': element.get('placeholder', ''),
-                    'href': element.get('href', ''),
-                    'text': element.get_text().strip(),
-                    'aria-label': element.get('aria-label', ''),
-                    'data-testid': element.get('data-testid', ''),
-                    'data-cy': element.get('data-cy', ''),
-                    'data-qa': element.get('data-qa', ''),
-                    'role': element.get('role', ''),
-                    'title': element.get('title', ''),
-                    'alt': element.get('alt', ''),
-                    'action': 'click',
-                    'selector': None,
-                    'has_svg': has_svg,
-                    'position': position,
-                    'parent_id': parent_id,
-                    'parent_class': parent_class,
-                    'parent_tag': parent_tag,
-                    'grandparent_id': grandparent_id,
-                    'grandparent_class': grandparent_class,
-                    'grandparent_tag': grandparent_tag,
-                    'absolute_position': absolute_position,
-                    'onclick': element.get('onclick', ''),
-                    'onmousedown': element.get('onmousedown', '')
-                }
-
-                # Add SVG path information if available
-                if svg_path:
-                    element_info['svg_path'] = svg_path
+                # Parent, grandparent and position data for structural selectors
+                # are derived from the node only when a selector asks for them
+                element_info = ElementRecord.from_node(element, 'button', 'click', structural=True)
 
                 # Create a selector for this element
-                element_info['selector'] = self._create_selector_for_element(element_info)
+                element_info['selector'] = self._create_unique_selector(element_info, soup)
 
                 if element_info['selector']:
                     elements_by_role['button'].append(element_info)
@@ -276,29 +248,11 @@ class RoleBasedTestGenerator:
                 if role not in elements_by_role:
                     elements_by_role[role] = []
 
-                element_info = {
-                    'tag': 'input',
-                    'id': element.get('id', ''),
-                    'class': ' '.join(element.get('class', [])) if element.get('class') else '',
-                    'name': element.get('name', ''),
-                    'type': input_type,
-                    'value': element.get('value', ''),
-                    'placeholder': element.get('placeholder', ''),
-                    'href': element.get('href', ''),
-                    'text': element.get('placeholder', '') or element.get('value', ''),
-                    'aria-label': element.get('aria-label', ''),
-                    'data-testid': element.get('data-testid', ''),
-                    'data-cy': element.get('data-cy', ''),
-                    'data-qa': element.get('data-qa', ''),
-                    'role': element.get('role', ''),
-                    'title': element.get('title', ''),
-                    'alt': element.get('alt', ''),
-                    'action': action,
-                    'selector': None
-                }
+                element_info = ElementRecord.from_node(element, 'input', action, type=input_type,
+                                                       text=element.get('placeholder', '') or element.get('value', ''))
 
                 # Create a selector for this element
-                element_info['selector'] = self._create_selector_for_element(element_info)
+                element_info['selector'] = self._create_unique_selector(element_info, soup)
 
                 if element_info['selector']:
                     elements_by_role[role].append(element_info)
@@ -329,29 +283,10 @@ class RoleBasedTestGenerator:
                         processed_elements.add(element_id)
 
                         # Extract useful attributes for creating selectors
-                        element_info = {
-                            'tag': element.name,
-                            'id': element.get('id', ''),
-                            'class': ' '.join(element.get('class', [])) if element.get('class') else '',
-                            'name': element.get('name', ''),
-                            'type': element.get('type', ''),
-                            'value': element.get('value', ''),
-                            'placeholder': element.get('placeholder', ''),
-                            'href': element.get('href', ''),
-                            'text': element.get_text().strip(),
-                            'aria-label': element.get('aria-label', ''),
-                            'data-testid': element.get('data-testid', ''),
-                            'data-cy': element.get('data-cy', ''),
-                            'data-qa': element.get('data-qa', ''),
-                            'role': element.get('role', ''),
-                            'title': element.get('title', ''),
-                            'alt': element.get('alt', ''),
-                            'action': action,
-                            'selector': None  # Will be filled in later
-                        }
+                        element_info = ElementRecord.from_node(element, element.name, action)
 
                         # Create a selector for this element
-                        element_info['selector'] = self._create_selector_for_element(element_info)
+                        element_info['selector'] = self._create_unique_selector(element_info, soup)
 
                         if element_info['selector']:
                             elements_by_role[role].append(element_info)
@@ -420,37 +355,23 @@ class RoleBasedTestGenerator:
                 if role not in elements_by_role:
                     elements_by_role[role] = []
 
-                element_info = {
-                    'tag': element.name,
-                    'id': element.get('id', ''),
-                    'class': ' '.join(element.get('class', [])) if element.get('class') else '',
-                    'name': element.get('name', ''),
-                    'type': element.get('type', ''),
-                    'value': element.get('value', ''),
-                    'placeholder': element.get('placeholder', ''),
-                    'href': element.get('href', ''),
-                    'text': element.get_text().strip(),
-                    'aria-label': element.get('aria-label', ''),
-                    'data-testid': element.get('data-testid', ''),
-                    'data-cy': element.get('data-cy', ''),
-                    'data-qa': element.get('data-qa', ''),
-                    'role': element.get('role', ''),
-                    'title': element.get('title', ''),
-                    'alt': element.get('alt', ''),
-                    'action': action,
-                    'selector': None
-                }
+                element_info = ElementRecord.from_node(element, element.name, action)
 
-                element_info['selector'] = self._create_selector_for_element(element_info)
+                element_info['selector'] = self._create_unique_selector(element_info, soup)
                 if element_info['selector']:
                     elements_by_role[role].append(element_info)
         except Exception as e:
             print(f"Error in third pass element extraction: {e}")
 
-        # FOURTH PASS: catch-all - get ALL remaining HTML elements that could be interactive
+        # FOURTH PASS: catch-all - get ALL remaining HTML elements that could be interactive,
+        # or only the ones listening for events when the crawl recorded their listeners
         try:
-            # Get all elements that might be interactive but weren't caught by previous passes
-            all_elements = soup.select('*')
+            if listener_paths is not None:
+                all_elements = [node for node_id, (node, path) in self.dom_paths(soup).items()
+                                if path in listener_paths]
+            else:
+                # Get all elements that might be interactive but weren't caught by previous passes
+                all_elements = soup.select('*')
             for element in all_elements:
                 # Skip non-visible or non-interactive elements
                 if element.name in ('html', 'head', 'meta', 'link', 'script', 'style', 'br', 'hr'):
@@ -501,28 +422,9 @@ class RoleBasedTestGenerator:
                 if role not in elements_by_role:
                     elements_by_role[role] = []
 
-                element_info = {
-                    'tag': element.name,
-                    'id': element.get('id', ''),
-                    'class': ' '.join(element.get('class', [])) if element.get('class') else '',
-                    'name': element.get('name', ''),
-                    'type': element.get('type', ''),
-                    'value': element.get('value', ''),
-                    'placeholder': element.get('placeholder', ''),
-                    'href': element.get('href', ''),
-                    'text': element.get_text().strip(),
-                    'aria-label': element.get('aria-label', ''),
-                    'data-testid': element.get('data-testid', ''),
-                    'data-cy': element.get('data-cy', ''),
-                    'data-qa': element.get('data-qa', ''),
-                    'role': element.get('role', ''),
-                    'title': element.get('title', ''),
-                    'alt': element.get('alt', ''),
-                    'action': action,
-                    'selector': None
-                }
+                element_info = ElementRecord.from_node(element, element.name, action)
 
-                element_info['selector'] = self._create_selector_for_element(element_info)
+                element_info['selector'] = self._create_unique_selector(element_info, soup)
                 if element_info['selector']:
                     elements_by_role[role].append(element_info)
         except Exception as e:
@@ -581,6 +483,134 @@ class RoleBasedTestGenerator:
         # Combine everything into a unique string
         return f"{tag}:{classes}:{text}:{':'.join(attrs)}"
 
+    def _create_unique_selector(self, element_info, document):
+        """
+        Pick a selector that matches exactly one element in the parsed document.
+        Starts with the selector from _create_selector_for_element and escalates to
+        more specific strategies until one is unique. The match count is stored in
+        element_info['match_count'].
+
+        Returns:
+            str: The unique selector, or None if the element can't be addressed uniquely
+        """
+        for selector in self._selector_candidates(element_info):
+            if self._count_selector_matches(document, selector) == 1:
+                element_info['match_count'] = 1
+                return selector
+        self._unaddressable_count += 1
+        return None
+
+    def _selector_candidates(self, element_info):
+        """Yield selector candidates for an element, from most readable to most specific"""
+        yield self._create_selector_for_element(element_info)
+
+        tag = element_info['tag']
+        if element_info.get('id'):
+            yield f"{tag}[id={self._css_string(element_info['id'])}]"
+
+        # Single distinguishing attributes, then all of them combined
+        attr_parts = []
+        for attr in ('data-testid', 'data-cy', 'data-qa', 'name', 'aria-label', 'placeholder',
+                     'title', 'alt', 'href', 'type', 'role', 'value'):
+            value = element_info.get(attr)
+            if value:
+                attr_part = f"[{attr}={self._css_string(value)}]"
+                attr_parts.append(attr_part)
+                yield f"{tag}{attr_part}"
+        if len(attr_parts) > 1:
+            yield f"{tag}{''.join(attr_parts)}"
+
+        classes = element_info['class'].split() if element_info.get('class') else []
+        class_part = ''.join(f".{soupsieve.escape(cls)}" for cls in classes)
+        if class_part:
+            yield f"{tag}{class_part}{''.join(attr_parts)}"
+
+        text = ' '.join(element_info.get('text', '').split())[:50]
+        if text:
+            yield f"{tag}{class_part}{''.join(attr_parts)}:has-text({self._css_string(text)})"
+
+        # Last resort: the element's position in the DOM
+        node = element_info.get('node')
+        if node is not None:
+            yield self._structural_selector(node)
+
+    def _css_string(self, value):
+        """Quote a value for use as a CSS string"""
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ') + '"'
+
+    def _structural_selector(self, node):
+        """
+        Build a selector from the element's nth-of-type position under its closest
+        ancestor with an id. nth-of-type is used rather than nth-child because
+        optimize_html removes script, style and svg siblings that exist on the live page.
+        """
+        parts = []
+        current = node
+        while current is not None and current.name not in (None, '[document]'):
+            if current.get('id') and current is not node:
+                parts.append(f"{current.name}[id={self._css_string(current['id'])}]")
+                break
+            position = 1 + len(current.find_previous_siblings(current.name))
+            parts.append(f"{current.name}:nth-of-type({position})")
+            current = current.parent
+        return ' > '.join(reversed(parts))
+
+    def _count_selector_matches(self, document, selector):
+        """
+        Count how many elements a generated selector matches in the parsed document.
+        Playwright's :has-text() is matched like Playwright does it, ignoring case and
+        runs of whitespace, on the elements the rest of the selector matches.
+        Counting stops at 2 since only uniqueness matters.
+
+        Returns:
+            int: Number of matches (0, 1 or 2 for "many"), or None if the selector
+                 can't be evaluated offline or is not valid
+        """
+        if not selector:
+            return None
+        cache = self._selector_match_cache.setdefault(id(document), {})
+        if selector in cache:
+            return cache[selector]
+
+        count = None
+        # :nth-match() is not valid on its own in Playwright either, and :nth-child()
+        # positions are shifted by the siblings optimize_html removed
+        if ':nth-match(' not in selector and ':nth-child(' not in selector:
+            try:
+                count = self._count_matches(document, selector)
+            except Exception:
+                count = None
+        cache[selector] = count
+        return count
+
+    def _count_matches(self, document, selector):
+        """Count (up to 2) the matches of a selector whose :has-text() filters, if any, end it"""
+        texts = list(HAS_TEXT_PATTERN.finditer(selector))
+        if not texts:
+            return len(document.select(selector, limit=2))
+        css = selector[:texts[0].start()]
+        # Only a filter on the last compound selector can be applied to its matches
+        if HAS_TEXT_PATTERN.sub('', selector[texts[0].start():]) or not css or css != css.rstrip() \
+                or css[-1] in '>+~':
+            return None
+        needles = [self._normalize_text(self._css_unquote(match.group(1))) for match in texts]
+        count = 0
+        for element in document.select(css):
+            text = self._normalize_text(element.get_text())
+            if all(needle in text for needle in needles):
+                count += 1
+                if count == 2:
+                    break
+        return count
+
+    def _css_unquote(self, value):
+        """Value of a quoted CSS string, the inverse of _css_string"""
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+
+    def _normalize_text(self, text):
+        """Text as :has-text() compares it: lowercased, with runs of whitespace collapsed"""
+        return ' '.join(text.split()).lower()
+
     def _create_selector_for_element(self, element_info):
         """
         Create a robust selector for an element based on its attributes.
@@ -932,17 +962,10 @@ class RoleBasedTestGenerator:
                         step = step_template.format(selector=selector_str)
 
                     # Add try/except block for robustness
-                    display_text = element['text'] if element['text'] else element['selector']
-                    # Sanitize display_text to prevent syntax errors in generated code
+                    display_text = self._get_display_text(element)
                     if display_text:
-                        # Replace newlines and tabs with spaces
-                        display_text = display_text.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-                        # Replace multiple spaces with a single space
-                        display_text = ' '.join(display_text.split())
-                        # Escape single quotes
-                        display_text = display_text.replace("'", "\\'") 
-                        # Limit length to prevent overly long strings
-                        display_text = display_text[:100] if len(display_text) > 100 else display_text
+                        # Escape single quotes to prevent syntax errors in generated code
+                        display_text = display_text.replace("'", "\\'")
 
                     # For elements that should cause navigation, add page change detection
                     if role in ['button', 'link', 'form'] or action == 'click':
@@ -1027,37 +1050,397 @@ class RoleBasedTestGenerator:
                     test_steps.append(f"        error_message=str(e)")
                     test_steps.append(f"    )")
                     test_steps.append(f"    # Continue with other elements")
+                    test_steps.append(f"    if VISUAL_MODE:")
+                    test_steps.append(f"        time.sleep(1)  # Add delay for visibility")
 
         return test_steps
 
-    def generate_test_script(self, url, html, html_file=None):
+    def _get_display_text(self, element):
+        """Single-line, length-limited description of an element for logs and reports"""
+        display_text = element['text'] if element['text'] else element['selector']
+        if display_text:
+            # Replace newlines and tabs with spaces
+            display_text = display_text.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
+            # Replace multiple spaces with a single space
+            display_text = ' '.join(display_text.split())
+            # Limit length to prevent overly long strings
+            display_text = display_text[:100] if len(display_text) > 100 else display_text
+        return display_text
+
+    def generate_plan_steps(self, elements_by_role):
         """
-        Generate a complete Playwright test script for a given URL and HTML.
+        Generate test plan steps based on the elements found.
+        Uses the same role order and form handling as generate_test_steps.
         """
-        # Parse the HTML
-        soup = self.optimize_html(html)
+        steps = []
+
+        # Process forms first to identify form elements
+        form_elements = set()
+        for form in elements_by_role.get('form', []):
+            form_elements.add(form['selector'])
+
+        # Process interactive elements by priority
+        priority_order = ['input', 'select', 'checkbox', 'radio', 'button', 'link', 'tab', 'menu', 'dialog', 'alert']
+
+        for role in priority_order:
+            for element in elements_by_role.get(role, []):
+                # Skip if this element is part of a form we'll test later
+                if element['selector'] in form_elements and role != 'form':
+                    continue
+
+                step = {
+                    'role': role,
+                    'action': element['action'],
+                    'selector': element['selector'],
+                    'description': self._get_display_text(element)
+                }
+                if element.get('match_count') is not None:
+                    step['match_count'] = element['match_count']
+                if element.get('component'):
+                    step['component'] = element['component']
+                steps.append(step)
+
+        return steps
+
+    def fingerprint_subtrees(self, root):
+        """
+        Compute a content fingerprint for every element subtree under root.
+        Identical markup (tag, attributes, text and children) gives an identical
+        fingerprint, so repeated headers, navs and footers can be matched across pages.
+
+        Returns:
+            dict: id(element) -> (fingerprint, number of interactive elements in the subtree)
+        """
+        fingerprints = {}
+        # Iterative post-order traversal so deep DOMs don't hit the recursion limit
+        stack = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if not children_done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children if isinstance(child, Tag))
+                continue
+
+            digest = hashlib.sha1(node.name.encode('utf-8'))
+            for attr, value in sorted(node.attrs.items()):
+                if isinstance(value, list):
+                    value = ' '.join(value)
+                digest.update(f"\0{attr}={value}".encode('utf-8', errors='replace'))
+
+            interactive = 1 if (node.name in SHARED_INTERACTIVE_TAGS or node.get('role') or node.get('onclick')) else 0
+            for child in node.children:
+                if isinstance(child, Tag):
+                    child_fingerprint, child_interactive = fingerprints[id(child)]
+                    digest.update(b"\1" + child_fingerprint.encode('ascii'))
+                    interactive += child_interactive
+                else:
+                    text = str(child).strip()
+                    if text:
+                        digest.update(b"\2" + text.encode('utf-8', errors='replace'))
+
+            fingerprints[id(node)] = (digest.hexdigest(), interactive)
+        return fingerprints
+
+    def dom_paths(self, root):
+        """
+        Compute the "tag:nth-of-type" path of every element under root, in document order
+        (e.g. "html:1/body:1/nav:1"). Indices only count same-name siblings, so removing
+        script, style or svg elements leaves the other paths unchanged.
+
+        Returns:
+            dict: id(node) -> (node, path)
+        """
+        paths = {}
+        stack = [(root, '')]
+        while stack:
+            node, path = stack.pop()
+            type_counts = {}
+            children = []
+            for child in node.children:
+                if isinstance(child, Tag):
+                    type_counts[child.name] = type_counts.get(child.name, 0) + 1
+                    child_path = f"{path}/{child.name}:{type_counts[child.name]}" if path else f"{child.name}:{type_counts[child.name]}"
+                    paths[id(child)] = (child, child_path)
+                    children.append((child, child_path))
+            stack.extend(reversed(children))
+        return paths
+
+    def find_component_candidates(self, soup):
+        """
+        List the subtrees of a page that could be shared components.
+
+        Returns:
+            dict: fingerprint -> list of occurrences, each a dict with the candidate
+                  fingerprints among the occurrence's ancestors ('ancestors') and its
+                  "tag:nth-of-type" path from the root ('path', e.g. "html:1/body:1/nav:1")
+        """
+        fingerprints = self.fingerprint_subtrees(soup)
+        paths = self.dom_paths(soup)
+        candidates = {}
+        # Top-down walk keeping the candidate fingerprints of the current ancestors
+        stack = [(soup, ())]
+        while stack:
+            node, ancestors = stack.pop()
+            fingerprint, interactive = fingerprints[id(node)]
+            is_candidate = (interactive >= MIN_COMPONENT_INTERACTIVE_ELEMENTS
+                            and node.name not in ('[document]', 'html', 'head', 'body'))
+            if is_candidate:
+                candidates.setdefault(fingerprint, []).append({'ancestors': list(ancestors), 'path': paths[id(node)][1]})
+                ancestors = ancestors + (fingerprint,)
+            stack.extend((child, ancestors) for child in node.children if isinstance(child, Tag))
+        return candidates
+
+    def _assign_shared_components(self, soup, elements_by_role, shared_components):
+        """
+        Attribute extracted elements to the shared components they sit in.
+        Elements of components this page represents are tagged with the component id;
+        elements of the other components are dropped, since they are tested on their
+        representative page.
+
+        Elements extracted from HTML are matched through their node's ancestors;
+        inventory elements, which have no node, through their dom_path.
+
+        Args:
+            soup: Optimized page HTML the elements were extracted from (None for inventories)
+            elements_by_role: Extracted elements, updated in place
+            shared_components: dict fingerprint -> {'id': component id, 'owned': bool,
+                               'paths': paths of the outermost occurrences on this page}
+        """
+        component_roots = {}
+        if soup is not None:
+            fingerprints = self.fingerprint_subtrees(soup)
+            # Only the outermost occurrences count; nested ones go with their ancestor
+            stack = [soup]
+            while stack:
+                node = stack.pop()
+                component = shared_components.get(fingerprints[id(node)][0])
+                if component is None:
+                    stack.extend(child for child in node.children if isinstance(child, Tag))
+                else:
+                    component_roots[id(node)] = component
+        component_paths = [(path, component) for component in shared_components.values()
+                           for path in component.get('paths', [])]
+
+        for role, elements in elements_by_role.items():
+            kept = []
+            for element in elements:
+                component = None
+                node = element.get('node')
+                while node is not None and component is None:
+                    component = component_roots.get(id(node))
+                    node = node.parent
+                dom_path = element.get('dom_path')
+                if component is None and dom_path:
+                    for path, path_component in component_paths:
+                        if dom_path == path or dom_path.startswith(path + '/'):
+                            component = path_component
+                            break
+                if component is None:
+                    kept.append(element)
+                elif component['owned']:
+                    element['component'] = component['id']
+                    kept.append(element)
+            elements_by_role[role] = kept
+
+    def _classify_inventory_record(self, record):
+        """
+        Map an inventory record to the generator's (role, action).
+        Records from the accessibility backend carry the computed role (ax_role),
+        which takes precedence over the role attribute and the tag.
+        """
+        tag = record['tag']
+        attributes = record.get('attributes', {})
+        if record.get('ax_role') in ARIA_ROLE_ACTIONS:
+            return ARIA_ROLE_ACTIONS[record['ax_role']]
+        aria_role = attributes.get('role', '').split(' ')[0].lower()
+        if aria_role in ARIA_ROLE_ACTIONS:
+            return ARIA_ROLE_ACTIONS[aria_role]
+
+        if tag == 'button':
+            return 'button', 'click'
+        if tag == 'a':
+            return 'link', 'click'
+        if tag == 'input':
+            input_type = attributes.get('type', '').lower()
+            # Empty input_type means it's a text input by default
+            if input_type == 'checkbox':
+                return 'checkbox', 'check'
+            if input_type == 'radio':
+                return 'radio', 'check'
+            if input_type in ('submit', 'button', 'reset', 'image'):
+                return 'button', 'click'
+            if input_type == 'range':
+                return 'slider', 'slide'
+            return 'input', 'fill'
+        if tag == 'select':
+            return 'select', 'select_option'
+        if tag == 'textarea' or attributes.get('contenteditable') == 'true':
+            return 'input', 'fill'
+        if tag == 'form':
+            return 'form', 'submit'
+        return 'clickable', 'click'
+
+    def extract_elements_from_inventory(self, records):
+        """
+        Build elements by role from an element inventory captured in the browser
+        (see element_inventory.py), without parsing the page HTML. Selectors were
+        already verified unique in the live DOM.
+        """
+        elements_by_role = {}
+        for record in records:
+            if not record.get('selector'):
+                self._unaddressable_count += 1
+                continue
+
+            attributes = record.get('attributes', {})
+            role, action = self._classify_inventory_record(record)
+            element_info = ElementRecord(
+                tag=record['tag'],
+                text=record.get('text', ''),
+                action=action,
+                selector=record['selector'],
+                match_count=record.get('match_count', 1),
+                dom_path=record.get('dom_path'),
+                bbox=record.get('bbox'),
+                visible=record.get('visible'),
+                hidden_reason=record.get('hidden_reason'),
+                obscured=record.get('obscured', False)
+            )
+            for attr in ATTRIBUTE_SLOTS:
+                element_info[attr] = attributes.get(attr, '')
+            elements_by_role.setdefault(role, []).append(element_info)
+
+        print(f"Total elements found in inventory: {sum(len(elements) for elements in elements_by_role.values())}")
+        for role, elements in elements_by_role.items():
+            print(f"  - {role}: {len(elements)} elements")
+
+        return elements_by_role
+
+    def _non_interactable_reason(self, element):
+        """
+        Why an element cannot be interacted with, or None if it can.
+        Inventory elements carry the computed style and layout of the rendered page;
+        for elements extracted from HTML only the hidden and inert attributes and
+        inline styles are known.
+        """
+        if 'hidden_reason' in element:
+            if element['hidden_reason']:
+                return element['hidden_reason']
+            if element.get('obscured') and element['action'] in POINTER_ACTIONS:
+                return 'obscured'
+            return None
+
+        node = element.get('node')
+        if node is None:
+            return None
+        if node.name == 'input' and (node.get('type') or '').lower() == 'hidden':
+            return 'display_none'
+        if HIDDEN_VISIBILITY_PATTERN.search(node.get('style') or ''):
+            return 'visibility_hidden'
+        while isinstance(node, Tag) and node.name != '[document]':
+            if node.has_attr('hidden') or HIDDEN_DISPLAY_PATTERN.search(node.get('style') or ''):
+                return 'display_none'
+            if node.has_attr('inert'):
+                return 'inert'
+            node = node.parent
+        return None
+
+    def _prune_non_interactable(self, elements_by_role):
+        """Drop elements that cannot be interacted with, counting them by reason"""
+        for role, elements in elements_by_role.items():
+            kept = []
+            for element in elements:
+                reason = self._non_interactable_reason(element)
+                if reason is None:
+                    kept.append(element)
+                else:
+                    self._pruned_counts[reason] = self._pruned_counts.get(reason, 0) + 1
+            elements_by_role[role] = kept
+
+    def _extract_page_elements(self, url, soup, shared_components=None, inventory=None, listener_paths=None):
+        """
+        Extract a page's elements by role, with fallback detection.
+        Uses the element inventory captured during the crawl when available,
+        otherwise the optimized HTML, restricted to listening elements when
+        listener_paths is given.
+        """
+        # Reset the selector counter so the output only depends on this page,
+        # not on which pages this generator instance has seen before
+        self._selector_counter = 0
+        self._selector_match_cache = {}
+        self._unaddressable_count = 0
+        self._pruned_counts = {}
 
         # Extract elements by role
-        elements_by_role = self.extract_elements_by_role(soup)
+        if inventory is not None:
+            elements_by_role = self.extract_elements_from_inventory(inventory)
+        else:
+            elements_by_role = self.extract_elements_by_role(soup, listener_paths)
+
+        if self._unaddressable_count:
+            print(f"Dropped {self._unaddressable_count} elements without a unique selector")
+        self._prune_non_interactable(elements_by_role)
+
+        # Shared components are only tested on their representative page
+        if shared_components:
+            self._assign_shared_components(soup, elements_by_role, shared_components)
 
         # If no interactive elements were found, try a more aggressive approach
-        if not elements_by_role or sum(len(elements) for elements in elements_by_role.values()) < 3:
+        if soup is not None and (not elements_by_role or sum(len(elements) for elements in elements_by_role.values()) < 3):
             print(f"Few elements detected, trying fallback detection for {url}")
             # Try a more aggressive element detection approach
             fallback_elements = self._fallback_element_detection(soup)
             if fallback_elements:
+                self._prune_non_interactable(fallback_elements)
                 elements_by_role.update(fallback_elements)
 
-        # Store information about the HTML file for reference
-        html_file_reference = f"# HTML file: {html_file}" if html_file else ""
+        if self._pruned_counts:
+            reasons = ', '.join(f"{reason}: {count}" for reason, count in sorted(self._pruned_counts.items()))
+            print(f"Pruned {sum(self._pruned_counts.values())} elements that cannot be interacted with ({reasons})")
 
         # No limits - test all elements
         for role in elements_by_role:
             elements = elements_by_role[role]
             print(f"Testing all {len(elements)} {role} elements")
 
-        # Generate test steps
-        test_steps = self.generate_test_steps(elements_by_role)
+        return elements_by_role
+
+    def generate_test_plan(self, url, html, html_file=None, inventory=None):
+        """
+        Generate a data-only test plan for a given URL and HTML.
+        When the crawl's element inventory is given, the HTML is not parsed.
+        The plan is executed by test_runner.run_test_plan.
+        """
+        soup = self.optimize_html(html) if inventory is None else None
+        elements_by_role = self._extract_page_elements(url, soup, inventory=inventory)
+        return self.render_test_plan(url, html_file, self.generate_plan_steps(elements_by_role))
+
+    def render_test_plan(self, url, html_file, steps, shared_components=None):
+        """
+        Wrap generated plan steps into a test plan for a page.
+        shared_components lists the ids of the shared components present on the
+        page, whose results are attributed to it by the reporter.
+        """
+        return {
+            'version': PLAN_FORMAT_VERSION,
+            'url': url,
+            'html_file': html_file,
+            'shared_components': shared_components or [],
+            'steps': steps
+        }
+
+    def generate_test_script(self, url, html, html_file=None):
+        """
+        Generate a complete Playwright test script for a given URL and HTML.
+        """
+        soup = self.optimize_html(html)
+        elements_by_role = self._extract_page_elements(url, soup)
+        return self.render_test_script(url, html_file, self.generate_test_steps(elements_by_role))
+
+    def render_test_script(self, url, html_file, test_steps):
+        """Wrap generated test steps into a complete test script for a page"""
+        # Store information about the HTML file for reference
+        html_file_reference = f"# HTML file: {html_file}" if html_file else ""
 
         # Build the complete test script
         test_script = f"""
@@ -1065,7 +1448,7 @@ class RoleBasedTestGenerator:
 # Generated using role-based template approach
 {html_file_reference}
 # Note: This test runs in headless mode by default. 
-# A visual mode version (with headless=False) will be created as test_X_visual.py when visual mode is enabled.
+# The executor sets VISUAL_MODE to run it in a visible browser with a pause between elements.
 
 from playwright.sync_api import sync_playwright
 import os
@@ -1080,6 +1463,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from element_tracker import ElementTracker
 from session_manager import session_manager
 
+# Page under test
+TEST_URL = "{url}"
+
+# Run with a visible browser and pause between elements
+VISUAL_MODE = False
+
 def create_screenshot_dir():
     \"\"\"Create screenshots directory if it doesn't exist\"\"\"
     screenshots_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "screenshots")
@@ -1159,7 +1548,7 @@ def test_page():
             print(f"Starting test for {url}")
 
             # Launch browser
-            browser = p.chromium.launch(headless=True, args=[
+            browser = p.chromium.launch(headless=not VISUAL_MODE, args=[
                 '--disable-web-security',
                 '--disable-features=IsolateOrigins,site-per-process',
                 '--disable-site-isolation-trials',
@@ -1280,33 +1669,268 @@ if __name__ == "__main__":
 """
         return test_script
 
-def generate_tests_with_templates(pages, out_dir="generated_tests"):
+_generator_fingerprint = None
+
+def _generator_source_files():
+    """
+    Source files of this module and of the project modules it uses, directly or through
+    each other, found from the functions, classes and modules they import.
+    """
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = set()
+    pending = [sys.modules[__name__]]
+    while pending:
+        module = pending.pop()
+        source_file = os.path.abspath(getattr(module, '__file__', None) or '')
+        if os.path.dirname(source_file) != module_dir or source_file in sources:
+            continue
+        sources.add(source_file)
+        for value in vars(module).values():
+            imported = value if inspect.ismodule(value) else inspect.getmodule(value)
+            if imported is not None:
+                pending.append(imported)
+    return sorted(sources)
+
+def generator_fingerprint():
+    """
+    Fingerprint of the generator code, used to invalidate cached generation output.
+    Covers this module, the project modules it uses (see _generator_source_files) and
+    the plan format version.
+    """
+    global _generator_fingerprint
+    if _generator_fingerprint is None:
+        digest = hashlib.sha256(f"plan-v{PLAN_FORMAT_VERSION}".encode('utf-8'))
+        for source_file in _generator_source_files():
+            digest.update(os.path.basename(source_file).encode('utf-8'))
+            try:
+                with open(source_file, 'rb') as f:
+                    digest.update(f.read())
+            except OSError:
+                pass
+        _generator_fingerprint = digest.hexdigest()
+    return _generator_fingerprint
+
+def _find_page_component_candidates(page):
+    """Process pool worker listing a page's shared component candidates"""
+    generator = RoleBasedTestGenerator()
+    return generator.find_component_candidates(generator.optimize_html(page['html']))
+
+def find_shared_components(page_candidates, min_pages=2):
+    """
+    Decide which repeated subtrees are shared components and where each is tested.
+
+    A candidate subtree is shared when it appears on at least min_pages pages.
+    Each shared component is tested on the first page where it is not nested
+    inside another shared component (its representative page).
+
+    Args:
+        page_candidates: Per page, the result of find_component_candidates
+        min_pages: Minimum number of pages a subtree must appear on
+
+    Returns:
+        list: Per page, dict fingerprint -> {'id': component id, 'owned': bool,
+              'paths': paths of the component's outermost occurrences on the page}
+    """
+    page_counts = {}
+    for candidates in page_candidates:
+        for fingerprint in candidates:
+            page_counts[fingerprint] = page_counts.get(fingerprint, 0) + 1
+    shared = {fingerprint for fingerprint, count in page_counts.items() if count >= min_pages}
+
+    representatives = {}
+    page_components = []
+    for page_index, candidates in enumerate(page_candidates):
+        components = {}
+        for fingerprint, occurrences in candidates.items():
+            if fingerprint not in shared:
+                continue
+            # Skip components that only occur inside another shared component here
+            outermost_paths = [occurrence['path'] for occurrence in occurrences
+                               if shared.isdisjoint(occurrence['ancestors'])]
+            if not outermost_paths:
+                continue
+            representatives.setdefault(fingerprint, page_index)
+            components[fingerprint] = {
+                'id': fingerprint[:12],
+                'owned': representatives[fingerprint] == page_index,
+                'paths': outermost_paths
+            }
+        page_components.append(components)
+    return page_components
+
+def _generate_page_steps(page, output_format="plan", cache_dir=None, shared_components=None):
+    """
+    Generate the plan or script steps for a single page with a fresh generator.
+    Used as the process pool worker, so it must stay a module-level function.
+
+    Test plans are built from the page's element inventory when the crawl captured
+    one, in which case the HTML is not parsed at all. Scripts are built from the
+    HTML, using the inventory's event listener data for the catch-all pass.
+
+    Returns:
+        tuple: (generated steps, whether they came from the generation cache)
+    """
+    generator = RoleBasedTestGenerator()
+
+    inventory = page.get('inventory')
+    if inventory is None and page.get('inventory_file'):
+        inventory = load_element_inventory(page['inventory_file'])
+
+    # Inventories captured with event listeners list them on every record
+    listener_paths = None
+    if inventory and any('listeners' in record for record in inventory):
+        listener_paths = {record['dom_path'] for record in inventory if record.get('listeners')}
+    if output_format != "plan":
+        inventory = None
+
+    if inventory is not None:
+        soup = None
+        source = json.dumps(inventory, sort_keys=True, separators=(',', ':'))
+        source_format = "inventory"
+    else:
+        soup = generator.optimize_html(page['html'])
+        source = str(soup)
+        source_format = output_format
+
+    # Look the page up in the generation cache by its optimized HTML or inventory
+    cache = GenerationCache(cache_dir, fingerprint=generator_fingerprint()) if cache_dir else None
+    if cache:
+        components_key = ','.join(sorted(
+            f"{fingerprint}:{int(component['owned'])}:{'|'.join(component.get('paths', []))}"
+            for fingerprint, component in (shared_components or {}).items()))
+        if listener_paths is not None and inventory is None:
+            components_key += ';listeners:' + ','.join(sorted(listener_paths))
+        cache_key = cache.make_key(source, source_format, components_key)
+        steps = cache.get(cache_key)
+        if steps is not None:
+            return steps, True
+
+    elements_by_role = generator._extract_page_elements(page['url'], soup, shared_components, inventory, listener_paths)
+    if output_format == "script":
+        steps = generator.generate_test_steps(elements_by_role)
+    else:
+        steps = generator.generate_plan_steps(elements_by_role)
+    if cache:
+        cache.put(cache_key, steps)
+    return steps, False
+
+def generate_tests_with_templates(pages, out_dir="generated_tests", workers=None, output_format="plan",
+                                  cache_dir=".generation_cache", dedupe_shared_components=True,
+                                  max_steps_per_page=None, time_budget_per_page=None, results_dir="test_results"):
     """
     Generate Playwright tests for a list of pages using role-based templates.
+
+    Each page is generated independently, so with more than one worker the pages
+    are spread over a process pool. Tests are still written as test_{i} in the
+    original page order. Pages whose optimized HTML was already generated by the
+    same generator version are served from the generation cache, and pages with
+    identical HTML within a run are only generated once.
+
+    For test plans, subtrees repeated across pages (headers, navs, footers,
+    cookie banners) are tested once on a representative page, and every page
+    containing them lists their ids in its plan's shared_components.
+
+    Plan steps are ordered by expected value (see element_priority.py), so the
+    highest-scoring elements run first, and cut to the per-page step or time budget.
+
+    Args:
+        pages: List of crawled page dicts (url, html, html_file)
+        out_dir: Directory where the tests are written
+        workers: Number of generator processes (defaults to the CPU count,
+                 1 disables the process pool)
+        output_format: "plan" writes test_{i}.json plans for test_runner,
+                       "script" writes standalone test_{i}.py scripts
+        cache_dir: Directory of the persistent generation cache (None disables it)
+        dedupe_shared_components: Test shared components once per run (plans only)
+        max_steps_per_page: Maximum number of steps per plan (None for no limit)
+        time_budget_per_page: Maximum estimated run time per plan in seconds (None for no limit)
+        results_dir: Directory of previous element results, used to favour past failures
     """
+    if output_format not in ("plan", "script"):
+        raise ValueError(f"Unknown output format: {output_format}")
+
     os.makedirs(out_dir, exist_ok=True)
     test_scripts = []
-    generator = RoleBasedTestGenerator()
 
-    print(f"[Template] Processing {len(pages)} pages")
+    # Pages with byte-identical HTML only need to be generated once per run
+    unique_pages = []
+    unique_index_by_hash = {}
+    page_unique_index = []
+    for page in pages:
+        html_hash = hashlib.sha256(page['html'].encode('utf-8', errors='replace')).hexdigest()
+        if html_hash not in unique_index_by_hash:
+            unique_index_by_hash[html_hash] = len(unique_pages)
+            unique_pages.append(page)
+        page_unique_index.append(unique_index_by_hash[html_hash])
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(unique_pages)))
+
+    print(f"[Template] Processing {len(pages)} pages ({len(unique_pages)} unique) with {workers} worker(s)")
+
+    # Spawned workers do not inherit the parent's threads (Flask) or their locks
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) \
+        if workers > 1 else None
+    map_pages = executor.map if executor else map
+    cache_hits = 0
+    unique_steps = []
+    try:
+        page_components = [{} for _ in unique_pages]
+        if dedupe_shared_components and output_format == "plan" and len(unique_pages) > 1:
+            page_components = find_shared_components(list(map_pages(_find_page_component_candidates, unique_pages)))
+            component_ids = {component['id'] for components in page_components for component in components.values()}
+            repeats = sum(not component['owned'] for components in page_components for component in components.values())
+            print(f"[Template] Found {len(component_ids)} shared components, skipping {repeats} repeated occurrences")
+
+        generated = map_pages(_generate_page_steps, unique_pages, [output_format] * len(unique_pages),
+                              [cache_dir] * len(unique_pages), page_components)
+
+        # map() yields results in submission order, so indices match unique_pages
+        for page, (steps, cache_hit) in zip(unique_pages, generated):
+            unique_steps.append(steps)
+            cache_hits += cache_hit
+            print(f"[Template] Test generated for {page['url']}{' (cached)' if cache_hit else ''}")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if output_format == "plan":
+        failures = load_failure_history(results_dir)
+        selector_page_counts = count_selector_pages(unique_steps)
+    over_budget = 0
 
+    generator = RoleBasedTestGenerator()
     for i, page in enumerate(pages):
-        print(f"[Template] Processing page {i+1}/{len(pages)}: {page['url']}")
-
-        # Generate the test with template-based approach
-        test_code = generator.generate_test_script(
-            url=page['url'],
-            html=page['html'],
-            html_file=page.get('html_file', None)  # Pass the HTML file path if available
-        )
-
-        # Save the test script
-        script_path = os.path.join(out_dir, f"test_{i}.py")
-        with open(script_path, "w", encoding="utf-8") as f:
-            f.write(test_code)
+        steps = unique_steps[page_unique_index[i]]
+        html_file = page.get('html_file', None)  # Pass the HTML file path if available
+
+        # Save the test plan or script
+        if output_format == "script":
+            script_path = os.path.join(out_dir, f"test_{i}.py")
+            with open(script_path, "w", encoding="utf-8") as f:
+                f.write(generator.render_test_script(page['url'], html_file, steps))
+        else:
+            shared_components = sorted(component['id'] for component in page_components[page_unique_index[i]].values())
+            if unique_pages[page_unique_index[i]] is not page:
+                # Duplicate HTML - its shared components are already tested on the first copy
+                steps = [step for step in steps if 'component' not in step]
+            steps, skipped = prioritize_steps(steps, page['url'], selector_page_counts, failures,
+                                              max_steps_per_page, time_budget_per_page)
+            over_budget += skipped
+            script_path = os.path.join(out_dir, f"test_{i}.json")
+            with open(script_path, "w", encoding="utf-8") as f:
+                json.dump(generator.render_test_plan(page['url'], html_file, steps, shared_components), f,
+                          separators=(',', ':'))
 
         test_scripts.append(script_path)
-        print(f"[Template] Test generated for {page['url']} ({i+1}/{len(pages)})")
 
-    print(f"[Template] Generated {len(test_scripts)} test scripts")
+    print(f"[Template] Generated {len(test_scripts)} tests")
+    if over_budget:
+        print(f"[Template] Skipped {over_budget} lowest-scoring steps over the per-page budget")
+    if cache_dir:
+        lookups = len(unique_pages)
+        print(f"[Template] Generation cache: {cache_hits} hits, {lookups - cache_hits} misses "
+              f"({cache_hits / max(1, lookups) * 100:.1f}% hit rate), "
+              f"{len(pages) - len(unique_pages)} duplicate pages reused")
     return test_scripts
@@ -1,202 +1,293 @@
-import subprocess
 import os
-import sys
 import importlib.util
-import json
-import glob
+import multiprocessing
+from multiprocessing import util
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import time
+from element_tracker import ElementTracker, RESULTS_ID_ENV, collect_trackers
 
-def execute_tests(test_scripts, out_dir="test_results", visual_mode=False):
+# Playwright instance and browser shared by the test plans run in this process
+_shared_browser = None
+
+def execute_tests(test_scripts, out_dir="test_results", visual_mode=False, workers=1, shared_browser=True,
+                  async_pages=0, save_results=True, timeout=None, heartbeat_timeout=None,
+                  shard=None, manifest=None):
+    """
+    Execute test plans and scripts and collect their results.
+
+    Args:
+        test_scripts: Paths of the test plans (.json) and scripts (.py) to run
+        out_dir: Directory the element results files are written to
+        visual_mode: Run with a visible browser (always one test at a time)
+        workers: Number of tests run concurrently, each in its own worker process
+        shared_browser: Launch the browser once (per worker) and run each test plan in
+            a fresh context of it, instead of launching a browser per plan
+        async_pages: Run the test plans on this many concurrent pages of one browser with
+            the asyncio engine (see async_runner); 0 keeps one page per process. Needs
+            shared_browser; a timeout then cancels the overrunning plan's page instead of
+            killing a worker
+        save_results: Also write each test plan's records to element_results_<test name>.json
+            (previous runs' files feed the step priorities and navigation history)
+        timeout: Run each test in a supervised worker with this wall-clock budget in seconds,
+            killing it (and its browser) when it overruns or stops making progress, and
+            recording it once with its partial results (see test_supervisor)
+        heartbeat_timeout: Seconds a supervised test may go without recording an element
+            (defaults to test_supervisor.HEARTBEAT_TIMEOUT)
+        shard: (index, count) to run only slice index (from 1) of count, balanced by the
+            estimated cost of each test (see test_shards.shard_tests)
+        manifest: Shard manifest file to take the slices from (see test_shards.write_manifest)
+
+    Returns:
+        list: One result dict per test run, in the order of test_scripts
+    """
     os.makedirs(out_dir, exist_ok=True)
-    results = []
+    if shard:
+        from test_shards import shard_tests
+        index, count = shard
+        selected = shard_tests(test_scripts, index, count, manifest, results_dir=out_dir)
+        print(f"Shard {index}/{count}: running {len(selected)} of {len(test_scripts)} tests")
+        return execute_tests(selected, out_dir, visual_mode, workers, shared_browser, async_pages, save_results,
+                             timeout, heartbeat_timeout)
+    if async_pages and not visual_mode:
+        if not shared_browser:
+            raise ValueError("async_pages runs the test plans in contexts of one shared browser; "
+                             "it cannot be combined with shared_browser=False")
+        plans = [script for script in test_scripts if script.endswith('.json')]
+        if plans:
+            if timeout:
+                from test_supervisor import HEARTBEAT_TIMEOUT
+                heartbeat_timeout = heartbeat_timeout or HEARTBEAT_TIMEOUT
+            results = dict(zip(plans, execute_plans_async(plans, out_dir, async_pages, save_results,
+                                                          timeout, heartbeat_timeout)))
+            others = [script for script in test_scripts if script not in results]
+            results.update(zip(others, execute_tests(others, out_dir, visual_mode, workers, shared_browser,
+                                                     save_results=save_results, timeout=timeout,
+                                                     heartbeat_timeout=heartbeat_timeout)))
+            return [results[script] for script in test_scripts]
 
-    for script in test_scripts:
-        script_name = Path(script).stem
-        screenshot_path = os.path.join(out_dir, f"{script_name}_after.png")
+    if timeout:
+        from test_supervisor import run_supervised, HEARTBEAT_TIMEOUT
+        return run_supervised(test_scripts, out_dir, visual_mode, shared_browser, save_results,
+                              workers=1 if visual_mode else workers, timeout=timeout,
+                              heartbeat_timeout=heartbeat_timeout or HEARTBEAT_TIMEOUT)
 
-        # Clear any previous element tracking results
-        for old_result in glob.glob(os.path.join(out_dir, "element_results_*.json")):
-            try:
-                os.remove(old_result)
-            except:
-                pass
+    if workers <= 1 or visual_mode or len(test_scripts) <= 1:
+        try:
+            return [run_test(script, out_dir, visual_mode, shared_browser, save_results) for script in test_scripts]
+        finally:
+            close_shared_browser()
 
-        if visual_mode:
-            # Run in visual mode - modify the script to run with headless=False
-            try:
-                # Load the test file
-                test_path = os.path.abspath(script)
-
-                # Read the original code
-                with open(test_path, 'r', encoding='utf-8') as f:
-                    original_code = f.read()
-
-                # Modify the code to run in non-headless mode with comprehensive security disabling and add delays
-                modified_code = original_code.replace(
-                    "browser = p.chromium.launch(headless=True",
-                    "browser = p.chromium.launch(headless=False"
-                )
-                
-                # Add delays between actions for better visibility
-                modified_code = modified_code.replace(
-                    "# Continue with other elements",
-                    "# Continue with other elements\n                time.sleep(1)  # Add delay for visibility"
-                )
-
-                # Write to a temporary file
-                temp_path = test_path.replace('.py', '_visual.py')
-                with open(temp_path, 'w', encoding='utf-8') as f:
-                    f.write(modified_code)
-
-                # Run the modified test directly (not using subprocess to see output in real-time)
-                print(f"\nRunning test visually: {script_name}")
-                print("Press Ctrl+C to stop the test and continue to the next one.\n")
-
-                # Load and run the modified module
-                try:
-                    spec = importlib.util.spec_from_file_location("test_module", temp_path)
-                    test_module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(test_module)
-
-                    # Run the test
-                    test_module.test_page()
-                    success = True
-                    output = "Test ran in visual mode"
-                except Exception as e:
-                    success = False
-                    output = f"Error running test visually: {str(e)}"
-                    import traceback
-                    output += "\n" + traceback.format_exc()
-
-                # Don't remove the temporary file so it can be inspected if needed
-                # os.remove(temp_path)
-
-            except KeyboardInterrupt:
-                print("\nTest stopped by user. Moving to next test...")
-                success = False
-                output = "Test stopped by user"
-            except Exception as e:
-                success = False
-                output = f"Error running test visually: {str(e)}"
-                import traceback
-                output += "\n" + traceback.format_exc()
+    workers = min(workers, len(test_scripts))
+    print(f"Running {len(test_scripts)} tests with {workers} workers")
+    # Spawned workers do not inherit the parent's threads (Flask) or browser state
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_warm_worker) as pool:
+        count = len(test_scripts)
+        return list(pool.map(run_test, test_scripts, [out_dir] * count, [False] * count,
+                             [shared_browser] * count, [save_results] * count))
+
+def execute_plans_async(plans, out_dir="test_results", concurrency=4, save_results=True, timeout=None,
+                        heartbeat_timeout=None):
+    """
+    Run test plans concurrently on pages of one browser and collect their results.
+    With a timeout, a plan that overruns it or stops making progress is cancelled and
+    recorded with its partial results (see async_runner.run_test_plans).
+    """
+    import asyncio
+    from async_runner import run_test_plans
+    from test_runner import load_test_plan
+
+    results = {}
+    loaded = []
+    for plan in plans:
+        try:
+            loaded.append((plan, load_test_plan(plan), ElementTracker(output_dir=out_dir, test_id=Path(plan).stem)))
+        except Exception as e:
+            results[plan] = _test_result(plan, False, f"Error loading test plan: {e}", [], "Unknown URL", [], {})
+
+    print(f"Running {len(loaded)} test plans on {concurrency} concurrent pages")
+    try:
+        outcomes = asyncio.run(run_test_plans(
+            [plan_dict for _, plan_dict, _ in loaded],
+            output_dir=out_dir,
+            screenshots_dirs=[os.path.join(os.path.dirname(os.path.abspath(plan)), "screenshots", Path(plan).stem)
+                              for plan, _, _ in loaded],
+            element_trackers=[tracker for _, _, tracker in loaded],
+            concurrency=concurrency,
+            save_results=save_results,
+            timeout=timeout,
+            heartbeat_timeout=heartbeat_timeout
+        ))
+    except Exception as e:
+        outcomes = [e] * len(loaded)
+
+    for (plan, plan_dict, tracker), outcome in zip(loaded, outcomes):
+        if isinstance(outcome, BaseException):
+            success, output = False, f"Error running test plan: {outcome}"
         else:
-            # Run in normal mode (headless)
-            try:
-                # Create a modified version of the test script that explicitly calls save_results()
-                with open(script, 'r', encoding='utf-8') as f:
-                    original_code = f.read()
-                
-                # Check if the script already has a call to save_results()
-                if 'element_tracker.save_results()' not in original_code:
-                    # Add explicit call to save_results() before any return statements
-                    modified_code = original_code.replace(
-                        'return',
-                        'element_tracker.save_results()\n    return'
-                    )
-                    
-                    # Also add it at the end of the test_page function in case there's no return
-                    modified_code = modified_code.replace(
-                        'def test_page():\n',
-                        'def test_page():\n    try:\n'
-                    )
-                    modified_code = modified_code.replace(
-                        'with sync_playwright() as p:',
-                        'with sync_playwright() as p:\n        try:'
-                    )
-                    
-                    # Add a finally block to ensure save_results is called
-                    if 'finally:' not in modified_code:
-                        modified_code += "\n        finally:\n            try:\n                element_tracker.save_results()\n            except Exception as save_error:\n                print(f'Error saving element results: {save_error}')\n"
-                    
-                    # Write the modified script
-                    temp_script = script.replace('.py', '_with_save.py')
-                    with open(temp_script, 'w', encoding='utf-8') as f:
-                        f.write(modified_code)
-                    
-                    # Use the modified script
-                    script_to_run = temp_script
-                else:
-                    script_to_run = script
-                
-                # Run the test script
-                print(f"Running test script: {script_to_run}")
-                
-                # Instead of using subprocess, load and run the module directly like in visual mode
-                # This ensures the ElementTracker instance is in the same process
-                try:
-                    print("Loading test module directly to ensure element tracking works properly")
-                    spec = importlib.util.spec_from_file_location("test_module", script_to_run)
-                    test_module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(test_module)
-                    
-                    # Run the test
-                    test_module.test_page()
-                    success = True
-                    output = "Test ran successfully in direct execution mode"
-                except Exception as direct_error:
-                    print(f"Error in direct execution: {direct_error}")
-                    # Fall back to subprocess if direct execution fails
-                    result = subprocess.run(["python", script_to_run], capture_output=True, text=True, timeout=180)
-                    success = result.returncode == 0
-                    output = result.stdout + "\n" + result.stderr
-                
-                # Clean up temporary script
-                if script_to_run != script and os.path.exists(script_to_run):
-                    try:
-                        os.remove(script_to_run)
-                    except:
-                        pass
-                        
-            except Exception as e:
-                success = False
-                output = str(e)
-
-        # Find element tracking results
-        element_results = []
-        element_results_files = glob.glob(os.path.join(out_dir, "element_results_*.json"))
-        
-        # Debug output to help diagnose issues
-        print(f"Looking for element results in: {out_dir}")
-        print(f"Found {len(element_results_files)} element results files: {element_results_files}")
-        
-        if element_results_files:
-            try:
-                # Sort by modification time to get the most recent file
-                element_results_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
-                latest_file = element_results_files[0]
-                print(f"Loading element results from: {latest_file}")
-                
-                with open(latest_file, 'r', encoding='utf-8') as f:
-                    element_data = json.load(f)
-                    element_results = element_data.get('elements', [])
-                    print(f"Loaded {len(element_results)} element results")
-            except Exception as e:
-                print(f"Error loading element results: {e}")
+            success, output = True, "Test plan ran successfully"
+        results[plan] = _test_result(plan, success, output, tracker.elements, plan_dict['url'],
+                                     plan_dict.get('shared_components', []), tracker.stats)
+    return [results[plan] for plan in plans]
+
+def _test_result(script, success, output, element_results, url, shared_components, stats):
+    """Result dict of one test, as generate_report takes it"""
+    return {
+        "script": script,
+        "success": success,
+        "output": output,
+        "element_results": element_results,
+        "url": url,
+        "shared_components": shared_components,
+        "stats": stats
+    }
+
+def _warm_worker():
+    """Import playwright and the runner once per worker instead of once per test"""
+    import playwright.sync_api  # noqa: F401
+    import test_runner  # noqa: F401
+    # Close the worker's shared browser when the pool shuts the worker down
+    util.Finalize(None, close_shared_browser, exitpriority=10)
+
+def get_shared_browser(visual_mode=False):
+    """Return this process's shared browser, launching it on first use or after a crash"""
+    global _shared_browser
+    if _shared_browser and not _shared_browser[1].is_connected():
+        close_shared_browser()
+    if _shared_browser is None:
+        from playwright.sync_api import sync_playwright
+        from test_runner import launch_browser
+        playwright = sync_playwright().start()
+        try:
+            _shared_browser = (playwright, launch_browser(playwright, visual_mode))
+        except Exception:
+            playwright.stop()
+            raise
+        print("Launched shared browser")
+    return _shared_browser[1]
+
+def close_shared_browser():
+    """Close this process's shared browser, if one was launched"""
+    global _shared_browser
+    if _shared_browser is None:
+        return
+    playwright, browser = _shared_browser
+    _shared_browser = None
+    try:
+        browser.close()
+    except Exception as e:
+        print(f"Error closing shared browser: {e}")
+    try:
+        playwright.stop()
+    except Exception as e:
+        print(f"Error stopping playwright: {e}")
+
+def run_test(test, out_dir="test_results", visual_mode=False, shared_browser=True, save_results=True, test_id=None):
+    """
+    Run one test in this process and return its records and metadata.
+
+    Args:
+        test: A test plan dict, the path of a test plan (.json) or generated script (.py),
+            or an imported test script module
+        out_dir: Directory of the JSON results file
+        visual_mode: Run with a visible browser
+        shared_browser: Run a test plan in a fresh context of this process's shared
+            browser; generated scripts always launch their own
+        save_results: Also write the records of a test plan to element_results_<test id>.json
+            (generated scripts always save their own file)
+        test_id: Names the results file; defaults to the file name of the plan or script
+
+    Returns:
+        dict: script, success, output, element_results (the ElementTracker records), url,
+            shared_components and stats, as generate_report takes them
+    """
+    script = test if isinstance(test, str) else getattr(test, '__file__', None)
+    test_id = test_id or (Path(script).stem if script else 'test')
+    # Trackers that generated scripts create without a test id use this one, for this test only
+    previous_id = os.environ.get(RESULTS_ID_ENV)
+    os.environ[RESULTS_ID_ENV] = test_id
+    try:
+        if isinstance(test, dict) or (isinstance(test, str) and test.endswith('.json')):
+            return _run_plan(test, script, out_dir, visual_mode, shared_browser, save_results, test_id)
+        return _run_module(test, script, visual_mode)
+    finally:
+        if previous_id is None:
+            os.environ.pop(RESULTS_ID_ENV, None)
         else:
-            print("No element results files found. Check if element_tracker.save_results() is being called.")
-
-        # Add result
-        results.append({
-            "script": script,
-            "success": success,
-            "output": output,
-            "screenshot": screenshot_path if os.path.exists(screenshot_path) else None,
-            "element_results": element_results,
-            "url": get_url_from_script(script)
-        })
-
-    return results
-
-def get_url_from_script(script_path):
-    """Extract the URL from a test script"""
+            os.environ[RESULTS_ID_ENV] = previous_id
+
+def _run_plan(test, script, out_dir, visual_mode, shared_browser, save_results, test_id):
+    """Run a test plan with the shared runner, keeping its tracker's records even if it fails"""
+    from test_runner import load_test_plan, run_test_plan
+
+    plan = test if isinstance(test, dict) else None
+    element_tracker = ElementTracker(output_dir=out_dir, test_id=test_id)
     try:
-        with open(script_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if "original_url =" in line:
-                    url = line.split("=")[1].strip().strip('"').strip("'")
-                    return url
-    except:
-        pass
-    return "Unknown URL"
\ No newline at end of file
+        if plan is None:
+            plan = load_test_plan(script)
+        print(f"\nRunning test plan{' visually' if visual_mode else ''}: {test_id}")
+        # Screenshot names repeat across plans, so concurrent plans need their own directory
+        screenshots_root = os.path.dirname(os.path.abspath(script)) if script else "generated_tests"
+        run_test_plan(
+            plan,
+            output_dir=out_dir,
+            screenshots_dir=os.path.join(screenshots_root, "screenshots", test_id),
+            visual_mode=visual_mode,
+            browser=get_shared_browser(visual_mode) if shared_browser else None,
+            element_tracker=element_tracker,
+            save_results=save_results
+        )
+        success = True
+        output = "Test plan ran successfully"
+    except KeyboardInterrupt:
+        print("\nTest stopped by user. Moving to next test...")
+        success = False
+        output = "Test stopped by user"
+    except Exception as e:
+        success = False
+        output = f"Error running test plan: {str(e)}"
+        import traceback
+        output += "\n" + traceback.format_exc()
+
+    plan = plan or {}
+    return _test_result(script, success, output, element_tracker.elements, plan.get('url', "Unknown URL"),
+                        plan.get('shared_components', []), element_tracker.stats)
+
+def _run_module(test, script, visual_mode):
+    """Run a generated test script's test_page() and collect the records of the trackers it creates"""
+    trackers = []
+    module = None
+    try:
+        module = test if not isinstance(test, str) else _load_module(script)
+        module.VISUAL_MODE = visual_mode
+        print(f"\nRunning test script{' visually' if visual_mode else ''}: {script}")
+        if visual_mode:
+            print("Press Ctrl+C to stop the test and continue to the next one.\n")
+        with collect_trackers() as trackers:
+            module.test_page()
+        success = True
+        output = "Test script ran successfully"
+    except KeyboardInterrupt:
+        print("\nTest stopped by user. Moving to next test...")
+        success = False
+        output = "Test stopped by user"
+    except Exception as e:
+        success = False
+        output = f"Error running test script: {str(e)}"
+        import traceback
+        output += "\n" + traceback.format_exc()
+
+    element_results = [element for tracker in trackers for element in tracker.elements]
+    url = getattr(module, 'TEST_URL', None) or next(
+        (element['page_url'] for element in element_results if element.get('page_url')), "Unknown URL")
+    stats = {}
+    for tracker in trackers:
+        stats.update(tracker.stats)
+    return _test_result(script, success, output, element_results, url, [], stats)
+
+def _load_module(script):
+    """Import a generated test script as a fresh module"""
+    spec = importlib.util.spec_from_file_location(f"test_module_{Path(script).stem}", script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,216 @@
+import os
+import sys
+import glob
+import json
+from element_priority import test_page_url
+
+# Times a still-failing element is tried again after its first rerun
+DEFAULT_RETRIES = 2
+
+def is_failed(element):
+    """
+    Whether the interaction with a recorded element failed or errored. Skipped steps,
+    page-level records and elements whose interaction worked but that the tracker
+    judged non-working (e.g. '#' links) are left alone, since rerunning them gives
+    the same result.
+    """
+    if element.get('skipped') or element.get('element_type') == 'page':
+        return False
+    return not element.get('success')
+
+def _passed(element):
+    """Whether a rerun record shows the element working again (a skipped step shows nothing)"""
+    return bool(element.get('success')) and not element.get('skipped')
+
+def _element_key(element):
+    return (element.get('element_type'), element.get('selector'))
+
+def build_rerun_plan(test_id, elements, plans_dir="generated_tests"):
+    """
+    Build a test plan with only the steps whose elements failed in the last run.
+
+    The steps are taken from the test's plan (<plans_dir>/<test_id>.json) when there
+    is one, so they keep their action, description and component; elements of
+    generated scripts get a step with their role's default action.
+
+    Returns:
+        dict: The plan, or None if nothing failed
+    """
+    from test_runner import load_test_plan, PLAN_FORMAT_VERSION
+
+    failed = [element for element in elements if is_failed(element)]
+    if not failed:
+        return None
+    keys = {_element_key(element) for element in failed}
+
+    plan_path = os.path.join(plans_dir, f"{test_id}.json")
+    if os.path.exists(plan_path):
+        plan = load_test_plan(plan_path)
+        return dict(plan, steps=[step for step in plan['steps'] if (step['role'], step['selector']) in keys])
+
+    from template_generator import RoleBasedTestGenerator
+    role_selectors = RoleBasedTestGenerator().role_selectors
+    steps = []
+    for element in failed:
+        key = _element_key(element)
+        if key not in keys:
+            continue
+        keys.discard(key)
+        role, selector = key
+        step = {
+            'role': role,
+            'action': role_selectors.get(role, {}).get('action', 'click'),
+            'selector': selector,
+            'description': element.get('description', '')
+        }
+        if element.get('component'):
+            step['component'] = element['component']
+        steps.append(step)
+    return {
+        'version': PLAN_FORMAT_VERSION,
+        'url': failed[0]['page_url'],
+        'html_file': None,
+        'shared_components': [],
+        'steps': steps
+    }
+
+def rerun_test(test_id, results, plans_dir="generated_tests", results_dir="test_results", retries=DEFAULT_RETRIES,
+               visual_mode=False):
+    """
+    Rerun the failed elements of one test, trying the ones that still fail again
+    up to retries more times, each time in a fresh browser context.
+
+    Args:
+        test_id: Id of the test (the name of its results file)
+        results: Contents of the test's results file
+        plans_dir: Directory of the generated test plans
+        results_dir: Directory of the results files
+        retries: Extra attempts for elements that still fail
+        visual_mode: Run with a visible browser
+
+    Returns:
+        dict: (element type, selector) -> (latest record, number of attempts)
+    """
+    from test_executor import run_test
+
+    plan = build_rerun_plan(test_id, results.get('elements', []), plans_dir)
+    outcomes = {}
+    for attempt in range(1, retries + 2):
+        if not plan or not plan['steps']:
+            break
+        print(f"\nRerunning {len(plan['steps'])} failed elements of {test_id} (attempt {attempt})")
+        result = run_test(plan, results_dir, visual_mode, save_results=False, test_id=test_id)
+        for element in result['element_results']:
+            if element.get('element_type') != 'page':
+                outcomes[_element_key(element)] = (element, attempt)
+        still_failing = {key for key, (element, _) in outcomes.items() if not _passed(element)}
+        plan = dict(plan, steps=[step for step in plan['steps'] if (step['role'], step['selector']) in still_failing])
+    return outcomes
+
+def merge_rerun_results(results, outcomes):
+    """
+    Replace the records of rerun elements in a results file's contents with their
+    latest outcome, noting the attempts in rerun_attempts. A rerun that skipped the
+    element leaves its failure in place, so the failure history and the next rerun
+    still see it.
+
+    Returns:
+        int: Number of records that failed before and pass now
+    """
+    fixed = 0
+    elements = []
+    for element in results.get('elements', []):
+        outcome = outcomes.get(_element_key(element))
+        if outcome and is_failed(element):
+            record, attempts = outcome
+            if record.get('skipped'):
+                element = dict(element, rerun_attempts=attempts)
+            else:
+                if _passed(record):
+                    fixed += 1
+                element = dict(record, rerun_attempts=attempts)
+        elements.append(element)
+    results['elements'] = elements
+    return fixed
+
+# Lists the tests of the last run, written into the results directory
+LAST_RUN_FILE = "last_run.json"
+
+def save_last_run(results, results_dir="test_results"):
+    """Record which tests a run ran, from its result dicts, for rerun_failures"""
+    os.makedirs(results_dir, exist_ok=True)
+    with open(os.path.join(results_dir, LAST_RUN_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'tests': [result['script'] for result in results if result.get('script')]}, f, indent=2)
+
+def last_run_tests(results_dir="test_results"):
+    """
+    The tests of the last run, as save_last_run recorded them: test id -> its plan or script.
+    Tests left in the generated tests directory by earlier crawls are not among them.
+    """
+    try:
+        with open(os.path.join(results_dir, LAST_RUN_FILE), 'r', encoding='utf-8') as f:
+            scripts = json.load(f).get('tests', [])
+    except (OSError, ValueError) as e:
+        print(f"No record of the last run in {results_dir}: {e}")
+        return {}
+    return {os.path.splitext(os.path.basename(script))[0]: script for script in scripts}
+
+def rerun_failures(results_dir="test_results", retries=DEFAULT_RETRIES, visual_mode=False):
+    """
+    Rerun only the elements that failed or errored in the last run, with retries,
+    and merge their outcomes into the existing results files. The last run's tests
+    are those save_last_run recorded in results_dir.
+
+    Returns:
+        list: One result dict per results file, as generate_report takes them
+    """
+    from test_executor import close_shared_browser, _test_result
+
+    report_results = []
+    try:
+        for test_id, test_file in last_run_tests(results_dir).items():
+            plans_dir = os.path.dirname(test_file)
+            results_file = os.path.join(results_dir, f"element_results_{test_id}.json")
+            try:
+                with open(results_file, 'r', encoding='utf-8') as f:
+                    results = json.load(f)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                print(f"Error reading results file {results_file}: {e}")
+                continue
+            # A file left by an earlier run of another site reuses the test id for another page
+            page_url = test_page_url(test_file)
+            if any(element.get('page_url') not in (None, page_url) for element in results.get('elements', [])):
+                print(f"Skipping {results_file}: its results are not for {page_url}")
+                continue
+
+            outcomes = rerun_test(test_id, results, plans_dir, results_dir, retries, visual_mode)
+            if outcomes:
+                fixed = merge_rerun_results(results, outcomes)
+                with open(results_file, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, indent=2)
+                print(f"{test_id}: {fixed} of {len(outcomes)} rerun elements pass now")
+
+            plan_path = os.path.join(plans_dir, f"{test_id}.json")
+            shared_components = []
+            if os.path.exists(plan_path):
+                with open(plan_path, 'r', encoding='utf-8') as f:
+                    shared_components = json.load(f).get('shared_components', [])
+            elements = results.get('elements', [])
+            url = next((element['page_url'] for element in elements if element.get('page_url')), "Unknown URL")
+            report_results.append(_test_result(plan_path if os.path.exists(plan_path) else results_file, True,
+                                               "Failed elements rerun", elements, url, shared_components,
+                                               results.get('stats', {})))
+    finally:
+        close_shared_browser()
+    return report_results
+
+if __name__ == "__main__":
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+    from reporter import generate_report
+    generate_report(rerun_failures(
+        results_dir=options.get("results-dir", "test_results"),
+        retries=int(options.get("retries", DEFAULT_RETRIES)),
+        visual_mode="--visual" in sys.argv[1:]
+    ))
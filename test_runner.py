@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import traceback
+from contextlib import ExitStack
+from playwright.sync_api import sync_playwright
+from element_tracker import ElementTracker
+from session_manager import session_manager
+from plan_steps import (
+    VIEWPORT, REGION_MARGIN, debug_screenshots, run_sync, run_plan_steps, take_screenshot
+)
+
+# Version of the test plan format written by template_generator.generate_test_plan
+PLAN_FORMAT_VERSION = 1
+
+BROWSER_ARGS = [
+    '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--disable-site-isolation-trials',
+    '--allow-running-insecure-content',
+    '--disable-webgl-image-chromium',
+    '--ignore-certificate-errors',
+    '--disable-notifications',
+    '--disable-popup-blocking',
+    '--no-sandbox',
+    '--disable-gpu',
+    '--disable-software-rasterizer',
+    '--disable-dev-shm-usage'
+]
+
+def load_test_plan(plan_path):
+    """Load a test plan written by the template generator"""
+    with open(plan_path, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+    if plan.get('version') != PLAN_FORMAT_VERSION:
+        raise ValueError(f"Unsupported test plan version {plan.get('version')} in {plan_path}")
+    return plan
+
+def launch_browser(playwright, visual_mode=False):
+    """Launch Chromium with the runner's flags"""
+    return playwright.chromium.launch(headless=not visual_mode, args=BROWSER_ARGS)
+
+def new_page_context(browser, url):
+    """
+    Open a fresh browser context for one page, carrying the saved authenticated session.
+
+    Returns:
+        tuple: (context, whether a session was loaded into it)
+    """
+    context = browser.new_context(viewport=VIEWPORT)
+    print("Attempting to load authenticated session...")
+    session_loaded = session_manager.load_session(context, url)
+    if session_loaded:
+        print("Successfully loaded authenticated session")
+    else:
+        print("No authenticated session found or failed to load session")
+    return context, session_loaded
+
+def run_test_plan(plan, output_dir="test_results", screenshots_dir="generated_tests/screenshots",
+                  visual_mode=False, step_delay=1, batch_forms=True, test_id=None, browser=None,
+                  element_tracker=None, save_results=True, debug=None, region_margin=REGION_MARGIN):
+    """
+    Execute a test plan in a fresh browser context.
+
+    Args:
+        plan: Test plan dict (see template_generator.generate_test_plan)
+        output_dir: Directory where element results are saved
+        screenshots_dir: Directory where step screenshots are saved
+        visual_mode: Run with a visible browser and pause between steps
+        step_delay: Seconds to pause between steps in visual mode
+        batch_forms: Fill the fields of each form together in one round trip
+            instead of one step (and one capture) per field
+        test_id: Names the results file (see ElementTracker)
+        browser: Running browser to open the plan's context in, so many plans share
+            one browser; when None a browser is launched for this plan and closed after it
+        element_tracker: Tracker to record into, so the caller keeps the records even if
+            the plan fails (a new one is created when None)
+        save_results: Also write the records to the tracker's JSON results file
+        debug: Keep every step screenshot on disk, not only those of failed steps and
+            steps that changed the page (defaults to the RUNNER_DEBUG_SCREENSHOTS environment variable)
+        region_margin: Clip step screenshots to the step's element, the region it controls and
+            the popup it opened, plus this many pixels (see step_region); None captures the
+            whole viewport
+
+    The steps run as plan_steps.run_plan_steps describes.
+
+    Returns:
+        ElementTracker: The tracker holding the recorded element results
+    """
+    url = plan['url']
+    if debug is None:
+        debug = debug_screenshots()
+    # Create element tracker to record test results
+    if element_tracker is None:
+        element_tracker = ElementTracker(output_dir=output_dir, test_id=test_id)
+
+    with ExitStack() as stack:
+        context = page = None
+        try:
+            print(f"Starting test for {url}")
+
+            if browser is None:
+                # Launch a browser for this plan only
+                browser = launch_browser(stack.enter_context(sync_playwright()), visual_mode)
+                stack.callback(browser.close)
+
+            # Fresh context with the authenticated session, if one was saved
+            context, session_loaded = new_page_context(browser, url)
+            page = context.new_page()
+
+            # Set a longer default timeout to prevent timeout issues
+            page.set_default_timeout(30000)
+
+            run_sync(run_plan_steps(
+                page, plan, element_tracker, output_dir, screenshots_dir,
+                apply_storage=session_manager.apply_storage if session_loaded else None,
+                batch_forms=batch_forms, debug=debug, region_margin=region_margin,
+                pause=(lambda: time.sleep(step_delay)) if visual_mode else None
+            ))
+
+            print("Test completed successfully")
+
+        except Exception as e:
+            print(f"Test failed: {e}")
+            traceback.print_exc()
+            if page is not None:
+                run_sync(take_screenshot(page, "error_state", screenshots_dir))
+            raise
+        finally:
+            if context:
+                try:
+                    context.close()
+                except Exception as close_error:
+                    print(f"Error closing browser context: {close_error}")
+
+            # Save element tracking results
+            if save_results:
+                results_path = element_tracker.save_results()
+                print(f"Element tracking results saved to: {results_path}")
+            print_summary(element_tracker)
+
+    return element_tracker
+
+def print_summary(element_tracker):
+    """Print the element testing summary for one page"""
+    summary = element_tracker.get_summary()
+    print(f"\nElement Testing Summary:")
+    print(f"Total elements tested: {summary['total']}")
+    print(f"Successfully interacted: {summary['successful']} ({summary['successful']/max(1, summary['total'])*100:.1f}%)")
+    print(f"Working elements: {summary['working']} ({summary['working']/max(1, summary['total'])*100:.1f}%)")
+    if summary['skipped']:
+        print(f"Skipped (target missing, hidden or disabled): {summary['skipped']}")
+    stats = element_tracker.stats
+    if stats.get('reloads') or stats.get('reloads_avoided'):
+        print(f"Page reloads: {stats.get('reloads', 0)} performed, {stats.get('reloads_avoided', 0)} avoided")
+    print("\nBy element type:")
+    for element_type, stats in summary['by_type'].items():
+        print(f"  {element_type}: {stats['working']}/{stats['total']} working ({stats['working']/max(1, stats['total'])*100:.1f}%)")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python test_runner.py <test_plan.json> [--visual|-v] [--per-field] [--debug] [--region-margin=PX|--full-viewport]")
+        sys.exit(1)
+    plan_path = sys.argv[1]
+    run_test_plan(
+        load_test_plan(plan_path),
+        screenshots_dir=os.path.join(os.path.dirname(os.path.abspath(plan_path)), "screenshots"),
+        visual_mode=any(arg in ("--visual", "-v") for arg in sys.argv[2:]),
+        batch_forms="--per-field" not in sys.argv[2:],
+        debug=True if "--debug" in sys.argv[2:] else None,
+        region_margin=None if "--full-viewport" in sys.argv[2:] else next(
+            (int(arg.split("=", 1)[1]) for arg in sys.argv[2:] if arg.startswith("--region-margin=")), REGION_MARGIN)
+    )
@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import zlib
+from element_priority import load_duration_history, estimate_test_cost, test_page_url
+
+MANIFEST_FORMAT_VERSION = 2
+
+def _test_key(script, page_url):
+    """Key a test is sharded by: its page URL, which every machine agrees on, else its file name"""
+    return page_url or os.path.basename(script)
+
+def balance_shards(test_scripts, shard_count, results_dir="test_results"):
+    """
+    Split tests into shards of about equal estimated run time.
+
+    Each test's cost is its page's last run duration, or the estimate from its steps
+    (see element_priority.estimate_test_cost). The costliest tests are placed
+    first, each on the shard with the least work so far.
+
+    Returns:
+        list: shard_count lists of (test script, page URL, estimated seconds)
+    """
+    durations = load_duration_history(results_dir)
+    costs = [(script, *estimate_test_cost(script, durations)) for script in test_scripts]
+    shards = [[] for _ in range(shard_count)]
+    loads = [0.0] * shard_count
+    # Ties are broken by page so every machine computes the same split
+    for script, page_url, cost in sorted(costs, key=lambda item: (-item[2], _test_key(item[0], item[1]))):
+        shard = loads.index(min(loads))
+        shards[shard].append((script, page_url, cost))
+        loads[shard] += cost
+    return shards
+
+def write_manifest(test_scripts, shard_count, manifest_path, results_dir="test_results"):
+    """
+    Balance tests into shards and write the split to a manifest file, so that
+    runners without the results history run the same slices. Shards list the
+    pages they test, since each runner generates and numbers its own test files.
+
+    Returns:
+        dict: The manifest
+    """
+    shards = balance_shards(test_scripts, shard_count, results_dir)
+    manifest = {
+        'version': MANIFEST_FORMAT_VERSION,
+        'shards': [{
+            'pages': list(dict.fromkeys(_test_key(script, page_url) for script, page_url, _ in shard)),
+            'estimated_seconds': round(sum(cost for _, _, cost in shard), 1)
+        } for shard in shards]
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    for index, shard in enumerate(manifest['shards'], 1):
+        print(f"Shard {index}/{shard_count}: {len(shard['pages'])} pages, ~{shard['estimated_seconds']}s")
+    return manifest
+
+def load_manifest(manifest_path):
+    """Load a shard manifest, checking its format version"""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_FORMAT_VERSION:
+        raise ValueError(f"Unsupported shard manifest version {manifest.get('version')!r} in {manifest_path} "
+                         f"(expected {MANIFEST_FORMAT_VERSION})")
+    return manifest
+
+def shard_tests(test_scripts, shard_index, shard_count, manifest_path=None, results_dir="test_results"):
+    """
+    Select the tests one shard runs.
+
+    Args:
+        test_scripts: Paths of all the run's test plans and scripts
+        shard_index: Number of this shard, from 1 to shard_count
+        shard_count: Number of shards the run is split into
+        manifest_path: Take the split from this manifest (see write_manifest) instead of
+            balancing with this machine's results history; local tests are matched to
+            it by page URL, and pages missing from it are spread over the shards by URL
+        results_dir: Directory of previous runs' results, for their durations
+
+    Returns:
+        list: The shard's tests, in the order of test_scripts
+    """
+    if not 1 <= shard_index <= shard_count:
+        raise ValueError(f"Shard index {shard_index} is not between 1 and {shard_count}")
+    if manifest_path:
+        manifest = load_manifest(manifest_path)
+        if len(manifest['shards']) != shard_count:
+            raise ValueError(f"Manifest {manifest_path} has {len(manifest['shards'])} shards, not {shard_count}")
+        assigned = {page: index for index, shard in enumerate(manifest['shards'], 1) for page in shard['pages']}
+        selected = []
+        for script in test_scripts:
+            key = _test_key(script, test_page_url(script))
+            index = assigned.get(key) or zlib.crc32(key.encode('utf-8')) % shard_count + 1
+            if index == shard_index:
+                selected.append(script)
+        return selected
+
+    selected = {script for script, _, _ in balance_shards(test_scripts, shard_count, results_dir)[shard_index - 1]}
+    return [script for script in test_scripts if script in selected]
+
+def save_shard_results(results, results_path):
+    """Write the result dicts of one shard's run, for merge_shard_results"""
+    os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return results_path
+
+def merge_shard_results(results_paths):
+    """
+    Combine the results files of a run's shards into one list for generate_report.
+    Results are kept per shard file and test, not per page: a page can be tested by
+    several tests (e.g. before and after logging in), and shards number their test
+    files on their own. A test found twice in the same file keeps its last result.
+    """
+    merged = {}
+    for results_path in results_paths:
+        with open(results_path, 'r', encoding='utf-8') as f:
+            for result in json.load(f):
+                merged[(results_path, result.get('script'))] = result
+    return list(merged.values())
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] not in ("manifest", "merge"):
+        print("Usage: python test_shards.py manifest <shard count> <manifest.json> <test>...")
+        print("       python test_shards.py merge <report.html> <shard_results.json>...")
+        sys.exit(1)
+    if sys.argv[1] == "manifest":
+        write_manifest(sys.argv[4:], int(sys.argv[2]), sys.argv[3])
+    else:
+        from reporter import generate_report
+        results = merge_shard_results(sys.argv[3:])
+        print(f"Merged {len(results)} test results from {len(sys.argv) - 3} shards")
+        generate_report(results, sys.argv[2])
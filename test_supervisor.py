@@ -0,0 +1,217 @@
+import os
+import queue
+import signal
+import threading
+import time
+import multiprocessing
+from pathlib import Path
+from element_tracker import ElementTracker, watch_records
+
+# Seconds a test may go without recording an element before its worker is considered hung
+HEARTBEAT_TIMEOUT = 60
+
+# Seconds a worker gets to exit on its own after its last test
+SHUTDOWN_TIMEOUT = 10
+
+def run_supervised(test_scripts, out_dir="test_results", visual_mode=False, shared_browser=True,
+                   save_results=True, workers=1, timeout=300, heartbeat_timeout=HEARTBEAT_TIMEOUT):
+    """
+    Run tests in killable worker processes under a watchdog.
+
+    Each worker runs one test at a time and streams the test's records back as they
+    are made; every record is a heartbeat. A test that runs past its wall-clock
+    budget, or goes heartbeat_timeout seconds without a record, has its worker
+    killed together with the browser processes the worker started, and is recorded
+    once with the records it had already produced. It is never re-run; the next
+    test gets a fresh worker.
+
+    Args:
+        test_scripts: Paths of the test plans (.json) and scripts (.py) to run
+        out_dir: Directory the element results files are written to
+        visual_mode: Run with a visible browser
+        shared_browser: Let each worker run its test plans in fresh contexts of one browser
+        save_results: Also write each test's records to element_results_<test name>.json
+        workers: Number of tests run concurrently, each in its own supervised worker
+        timeout: Wall-clock budget of one test in seconds
+        heartbeat_timeout: Seconds without a record after which a test is considered hung
+
+    Returns:
+        list: One result dict per test, in the order of test_scripts
+    """
+    results = [None] * len(test_scripts)
+    pending = queue.Queue()
+    for index, script in enumerate(test_scripts):
+        pending.put((index, script))
+
+    def supervise():
+        worker = None
+        try:
+            while True:
+                try:
+                    index, script = pending.get_nowait()
+                except queue.Empty:
+                    return
+                if worker is None:
+                    worker = _Worker(out_dir, visual_mode, shared_browser, save_results)
+                results[index] = worker.run(index, script, timeout, heartbeat_timeout)
+                if not worker.alive():
+                    worker = None
+        finally:
+            if worker is not None:
+                worker.stop()
+
+    workers = max(1, min(workers, len(test_scripts)))
+    print(f"Running {len(test_scripts)} tests in {workers} supervised worker{'s' if workers > 1 else ''} "
+          f"({timeout:g}s per test, {heartbeat_timeout:g}s heartbeat)")
+    threads = [threading.Thread(target=supervise, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+class _Worker:
+    """A spawned process running tests one at a time, killed when a test overruns"""
+
+    def __init__(self, out_dir, visual_mode, shared_browser, save_results):
+        context = multiprocessing.get_context("spawn")
+        self.tasks = context.Queue()
+        self.messages = context.Queue()
+        self.out_dir = out_dir
+        self.save_results = save_results
+        self.process = context.Process(target=_worker_main, daemon=True,
+                                       args=(self.tasks, self.messages, out_dir, visual_mode,
+                                             shared_browser, save_results))
+        self.process.start()
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def run(self, index, script, timeout, heartbeat_timeout):
+        """Run one test in the worker and return its result, killing the worker if it overruns"""
+        self.tasks.put((index, script))
+        records = []
+        started = last_beat = time.monotonic()
+        while True:
+            now = time.monotonic()
+            wait = min(started + timeout, last_beat + heartbeat_timeout) - now
+            if wait <= 0:
+                if now >= started + timeout:
+                    reason = f"Test timed out after {timeout:g}s"
+                else:
+                    reason = f"Test hung: no progress for {heartbeat_timeout:g}s"
+                return self._abandon(script, reason, records, {'timed_out': True}, started)
+            try:
+                message = self.messages.get(timeout=min(wait, 1))
+            except queue.Empty:
+                if not self.process.is_alive():
+                    return self._abandon(script, f"Test worker exited with code {self.process.exitcode}",
+                                         records, {'worker_exit_code': self.process.exitcode}, started)
+                continue
+            kind, message_index, payload = message
+            if message_index != index:
+                continue
+            last_beat = time.monotonic()
+            if kind == 'record':
+                records.append(payload)
+            elif kind == 'result':
+                return payload
+
+    def _abandon(self, script, reason, records, stats, started):
+        """Kill the worker and its browsers and record the test once with its partial records"""
+        print(f"{reason}: {script}")
+        self.kill()
+        from test_executor import _test_result
+        url, shared_components = "Unknown URL", []
+        if script.endswith('.json'):
+            try:
+                from test_runner import load_test_plan
+                plan = load_test_plan(script)
+                url, shared_components = plan['url'], plan.get('shared_components', [])
+            except Exception:
+                pass
+        else:
+            url = next((record['page_url'] for record in records if record.get('page_url')), url)
+        if self.save_results:
+            tracker = ElementTracker(output_dir=self.out_dir, test_id=Path(script).stem)
+            tracker.elements = records
+            tracker.stats = stats
+            # The test's duration, not the tracker's: the cost history must see how long it ran
+            tracker.started_at = started
+            tracker.save_results()
+        return _test_result(script, False, f"{reason} ({len(records)} elements recorded before it stopped)",
+                            records, url, shared_components, stats)
+
+    def kill(self):
+        """Kill the worker process and reap the browser processes it started"""
+        descendants = _descendant_pids(self.process.pid)
+        self.process.kill()
+        self.process.join()
+        for pid in descendants:
+            try:
+                os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            except OSError:
+                pass
+        if descendants:
+            print(f"Reaped {len(descendants)} browser processes")
+
+    def stop(self):
+        """Ask the worker to exit after its last test, killing it if it does not"""
+        if not self.process.is_alive():
+            return
+        self.tasks.put(None)
+        self.process.join(SHUTDOWN_TIMEOUT)
+        if self.process.is_alive():
+            self.kill()
+
+def _descendant_pids(pid):
+    """
+    Pids of all processes descended from pid, read from /proc (empty where there is none).
+    Playwright starts browsers in their own process group, so killing the worker's group
+    would leave them running.
+    """
+    children = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces and parentheses; the parent pid follows the state
+        parent = int(stat[stat.rfind(')') + 2:].split()[1])
+        children.setdefault(parent, []).append(int(entry))
+
+    descendants = []
+    stack = [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            descendants.append(child)
+            stack.append(child)
+    return descendants
+
+def _worker_main(tasks, messages, out_dir, visual_mode, shared_browser, save_results):
+    """Worker loop: run the tests sent on tasks, streaming their records and results to messages"""
+    from test_executor import run_test, close_shared_browser
+
+    current = [None]
+
+    def forward(record):
+        messages.put(('record', current[0], record))
+
+    try:
+        with watch_records(forward):
+            while True:
+                task = tasks.get()
+                if task is None:
+                    break
+                current[0], script = task
+                result = run_test(script, out_dir, visual_mode, shared_browser, save_results)
+                messages.put(('result', current[0], result))
+    finally:
+        close_shared_browser()